@@ -0,0 +1,120 @@
+"""Compares the output and speed of the HTML stripping backends in bin/html_strippers.py
+
+Run from the root of the project with:
+
+    python3 -m benchmarks.benchmark_html_backends [XLSX or CSV files...]
+
+The backends are run over the string values of the test data files, a synthetic corpus of ROAM-like
+values, and any XLSX or CSV files given on the command line (e.g., your own ROAM exports). Every
+difference from the beautifulsoup backend is reported, followed by the throughput of each backend.
+"""
+import glob
+import random
+import sys
+import time
+
+from bin.csv_to_objects import convert_csv_to_objects
+from bin.html_strippers import DEFAULT_HTML_BACKEND, HTML_STRIPPERS
+from bin.xlsx_to_objects import convert_xlsx_to_objects
+
+# Maximum number of differences printed per backend
+MAX_REPORTED_DIFFERENCES = 10
+
+
+def load_file_values(filepaths):
+    """Get the string values of XLSX and CSV files"""
+    values = []
+    for filepath in filepaths:
+        if filepath.lower().endswith(".csv"):
+            objects = convert_csv_to_objects(filepath)
+        else:
+            objects = convert_xlsx_to_objects(filepath)
+        for row_object in objects:
+            values.extend(value for value in row_object.values()
+                          if isinstance(value, str) and value != "")
+    return values
+
+
+def create_synthetic_corpus(size=5000, seed=0):
+    """Create ROAM-like values: license notes and term descriptions with HTML, entities and unicode"""
+    randomizer = random.Random(seed)
+    words = ["license", "access", "users", "may", "not", "copy", "print", "archive", "electronic",
+             "café", "naïve", "ﬁle", "reserves", "&amp;", "&nbsp;", "&lt;b&gt;", "&#39;s", "Wiley", "—"]
+    wrappers = ["{}", "<p>{}</p>", "<b>{}</b>", "<div class=\"note\">{}</div>", "<ul><li>{}</li></ul>",
+                "{}<br>", "<a href=\"http://example.com/?a=1&b=2\">{}</a>", "<span style=\"x\">{}</span>\n"]
+
+    corpus = []
+    for _ in range(size):
+        parts = []
+        for _ in range(randomizer.randint(1, 12)):
+            sentence = " ".join(randomizer.choice(words)
+                                for _ in range(randomizer.randint(3, 25)))
+            parts.append(randomizer.choice(wrappers).format(sentence))
+        corpus.append("".join(parts))
+    return corpus
+
+
+def strip_all(strip_html, values):
+    """Strip every value, returning the outputs (or the exceptions raised)"""
+    outputs = []
+    for value in values:
+        try:
+            outputs.append(strip_html(value))
+        except Exception as e:
+            outputs.append(e)
+    return outputs
+
+
+def report_differences(values):
+    """Print the values each backend gives a different output for than the reference backend"""
+    reference_outputs = strip_all(HTML_STRIPPERS[DEFAULT_HTML_BACKEND], values)
+
+    for html_backend, strip_html in HTML_STRIPPERS.items():
+        if html_backend == DEFAULT_HTML_BACKEND:
+            continue
+
+        outputs = strip_all(strip_html, values)
+        differences = [(value, expected, actual) for value, expected, actual in zip(values, reference_outputs, outputs)
+                       if expected != actual]
+        print("{}: {} of {} values differ from {}".format(
+            html_backend, len(differences), len(values), DEFAULT_HTML_BACKEND))
+        for value, expected, actual in differences[:MAX_REPORTED_DIFFERENCES]:
+            print("    input:    " + repr(value[:200]))
+            print("    expected: " + repr(expected[:200]))
+            print("    actual:   " + repr(actual if isinstance(actual, Exception) else actual[:200]))
+
+
+def report_throughput(values, repeat=3):
+    """Print the number of values and megabytes each backend strips per second (best of repeat runs)"""
+    megabytes = sum(len(value.encode("utf-8")) for value in values) / 1e6
+
+    for html_backend, strip_html in HTML_STRIPPERS.items():
+        best_time = None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            strip_all(strip_html, values)
+            elapsed_time = time.perf_counter() - start_time
+            best_time = elapsed_time if best_time is None else min(best_time, elapsed_time)
+
+        print("{:<15} {:>10.0f} values/s {:>8.2f} MB/s".format(
+            html_backend, len(values) / best_time, megabytes / best_time))
+
+
+def main():
+    fixture_values = load_file_values(sorted(glob.glob("tests/testdata/*.xlsx")) +
+                                      sorted(glob.glob("tests/testdata/*.csv")))
+    synthetic_values = create_synthetic_corpus()
+    extra_values = load_file_values(sys.argv[1:])
+
+    for name, values in [("Test data", fixture_values), ("Synthetic corpus", synthetic_values),
+                         ("Input files", extra_values)]:
+        if not values:
+            continue
+        print("== " + name + " ({} values)".format(len(values)))
+        report_differences(values)
+        report_throughput(values)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compares the memory used by the combined licenses as dicts (plus their generateDS instances) and as License models
+
+Run from the root of the project with:
+
+    python3 -m benchmarks.benchmark_license_model [number of licenses] [terms per license]
+
+Synthetic ROAM licenses and license terms are converted and combined as handle.py does, with the test Mappings.
+The memory of each representation is measured with tracemalloc, on a fresh copy of it (so that nothing else
+shares its objects), and reported per license. This is the memory the combined licenses hold while they're written;
+the peak memory of a run, reached while the licenses are combined (before the models are created), isn't measured.
+"""
+import gc
+import pickle
+import random
+import sys
+import tracemalloc
+
+from bin.license_model import as_license_model
+from bin.roam_to_alma_interface import RoamAlmaInterface, normalize_term_key
+from config.config_test import Mappings, Settings
+
+ALLOWED_VALUES = ["yes", "no", "n/a"]
+
+
+def create_roam_objects(license_count, terms_per_license, seed=0):
+    """Create ROAM-like licenses and license terms, with the terms of the test Mappings"""
+    randomizer = random.Random(seed)
+    term_plan = RoamAlmaInterface.compile_term_mappings(Mappings, Settings.xsd_file)
+    term_names = [term_name for term_name in Mappings.term_mappings
+                  if term_plan[normalize_term_key(term_name)][2] is None or
+                  all(allowed in term_plan[normalize_term_key(term_name)][2] for allowed in ALLOWED_VALUES)]
+
+    roam_licenses = []
+    roam_license_terms = []
+    for license_index in range(license_count):
+        license_name = "Vendor {} Journals".format(license_index)
+        roam_licenses.append({"Name": license_name, "Start Date": "20200101", "End Date": "20251231",
+                              "License Links": "http://example.com/licenses/{}".format(license_index)})
+        for term_index in range(terms_per_license):
+            roam_license_terms.append({
+                "Name": randomizer.choice(term_names), "License Name": license_name, "Start Date": "20200101",
+                "End Date": "20251231", "Active": True, "Allowed": randomizer.choice(ALLOWED_VALUES),
+                "License Qualifiers": randomizer.choice(["", "", "On premises", "Authorized users only"]),
+                # Most descriptions are blank or boilerplate, a few are written for the license
+                "Description": randomizer.choice(["", "", "See the license",
+                                                  "Clause {}.{}".format(license_index, term_index)]),
+                "License Summary": "Summary of license {}".format(license_index),
+                "License Notes": "Notes of license {}".format(license_index),
+                "Publisher": "Vendor {}".format(license_index), "License Links": ""
+            })
+    return roam_licenses, roam_license_terms
+
+
+def create_combined_licenses(roam_licenses, roam_license_terms):
+    """Convert and combine the licenses, as handle.py does"""
+    alma_interface = RoamAlmaInterface(roam_licenses, roam_license_terms, Mappings, Settings)
+    alma_interface.get_converted_license_objects()
+    alma_interface.get_converted_license_term_objects()
+    alma_interface.combine_roam_license_and_license_terms()
+    return alma_interface
+
+
+def measure_copy(value):
+    """Get the bytes allocated by a fresh copy of a value (shared objects within it stay shared)"""
+    dump = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    gc.collect()
+    tracemalloc.start()
+    value_copy = pickle.loads(dump)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value_copy
+    return allocated
+
+
+def measure(license_count, terms_per_license):
+    """Get the bytes per license of each representation of the combined licenses"""
+    alma_interface = create_combined_licenses(*create_roam_objects(license_count, terms_per_license))
+    combined_licenses = alma_interface.converted_roam_licenses
+    generateds_instances = alma_interface.create_generateds_instances()
+    shared_objects = {}
+    license_models = [as_license_model(combined_license, shared_objects) for combined_license in combined_licenses]
+
+    return {
+        "dicts": measure_copy(combined_licenses) / license_count,
+        "dicts + generateDS": measure_copy((combined_licenses, generateds_instances)) / license_count,
+        "License models": measure_copy(license_models) / license_count
+    }
+
+
+def main():
+    license_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    terms_per_license = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    print("== {} licenses, {} license terms rows each".format(license_count, terms_per_license))
+    bytes_per_license = measure(license_count, terms_per_license)
+    for representation, allocated in bytes_per_license.items():
+        print("{:<20} {:>10.0f} bytes/license".format(representation, allocated))
+    print("License models use {:.1%} of the memory of dicts + generateDS".format(
+        bytes_per_license["License models"] / bytes_per_license["dicts + generateDS"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compares the results and speed of the XML validation backends in bin/xml_validators.py
+
+Run from the root of the project with:
+
+    python3 -m benchmarks.benchmark_validation_backends [number of licenses] [output folders...]
+
+A synthetic output set (licenses converted and combined as handle.py does, with the test Mappings, and written
+with the template serializer) is validated against both XSDs in config/, along with the XML files of any output
+folders given on the command line (e.g., the output of one of your own runs). One in every INVALID_EVERY
+synthetic documents is made invalid, to check that the backends reject the same documents. Every document the
+backends disagree on is reported, followed by the throughput of each backend.
+"""
+import glob
+import os
+import sys
+import time
+
+from bin.license_serializers import serialize_license_template
+from bin.xml_validators import VALIDATION_BACKENDS, XML_VALIDATION_ERRORS, get_lxml_schema, get_xml_schema, validate_xml
+from benchmarks.benchmark_license_model import create_combined_licenses, create_roam_objects
+
+XSD_FILES = ["config/erm_license_edited.xsd", "config/erm_license_official.xsd"]
+
+# One in this many synthetic documents gets a license status that isn't in the XSD
+INVALID_EVERY = 50
+
+# Maximum number of disagreements printed per XSD
+MAX_REPORTED_DIFFERENCES = 10
+
+
+def create_synthetic_documents(license_count, terms_per_license=40):
+    """Create the XML of synthetic licenses, some of them invalid"""
+    alma_interface = create_combined_licenses(*create_roam_objects(license_count, terms_per_license))
+
+    documents = []
+    for index, converted_license in enumerate(alma_interface.create_license_models()):
+        if index % INVALID_EVERY == INVALID_EVERY - 1:
+            converted_license.license_status = "SIGNED"
+        documents.append(serialize_license_template(converted_license))
+    return documents
+
+
+def load_documents(folders):
+    """Get the XML files of output folders"""
+    documents = []
+    for folder in folders:
+        for filepath in sorted(glob.glob(os.path.join(folder, "*.xml"))):
+            with open(filepath, "rb") as xml_file:
+                documents.append(xml_file.read())
+    return documents
+
+
+def validate_all(documents, xsd_file, validation_backend):
+    """Validate every document, returning whether each one is valid"""
+    results = []
+    for document in documents:
+        try:
+            validate_xml(document, xsd_file, validation_backend)
+            results.append(True)
+        except XML_VALIDATION_ERRORS:
+            results.append(False)
+    return results
+
+
+def report(documents, xsd_file, repeat=3):
+    """Print the documents the backends disagree on, and the documents each backend validates per second (best of
+    repeat runs, not counting compiling the XSD)"""
+    # Compile the XSD up front
+    get_xml_schema(xsd_file)
+    get_lxml_schema(xsd_file)
+
+    results = {}
+    best_times = {}
+    for validation_backend in VALIDATION_BACKENDS:
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            results[validation_backend] = validate_all(documents, xsd_file, validation_backend)
+            elapsed_time = time.perf_counter() - start_time
+            best_times[validation_backend] = min(best_times.get(validation_backend, elapsed_time), elapsed_time)
+
+    reference_results = results[VALIDATION_BACKENDS[0]]
+    differences = [index for index, results_of_document in enumerate(zip(*results.values()))
+                   if len(set(results_of_document)) > 1]
+    print("{} of {} documents valid; the backends disagree on {}".format(
+        sum(reference_results), len(documents), len(differences)))
+    for index in differences[:MAX_REPORTED_DIFFERENCES]:
+        print("    document {}: ".format(index) + ", ".join(
+            "{} says {}".format(validation_backend, "valid" if results[validation_backend][index] else "invalid")
+            for validation_backend in VALIDATION_BACKENDS))
+
+    for validation_backend in VALIDATION_BACKENDS:
+        print("{:<15} {:>10.0f} documents/s".format(validation_backend, len(documents) / best_times[validation_backend]))
+
+
+def main():
+    license_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    synthetic_documents = create_synthetic_documents(license_count)
+    output_documents = load_documents(sys.argv[2:])
+
+    for name, documents in [("Synthetic output", synthetic_documents), ("Output folders", output_documents)]:
+        if not documents:
+            continue
+        for xsd_file in XSD_FILES:
+            print("== " + name + " ({} documents), {}".format(len(documents), xsd_file))
+            report(documents, xsd_file)
+            print()
+
+
+if __name__ == "__main__":
+    main()
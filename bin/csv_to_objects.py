@@ -1,54 +1,55 @@
 import csv
-import unicodedata
-from bs4 import BeautifulSoup
 
-# USE THE XLSX VERSION INSTEAD. IT HAS A DIFFERENT OUTPUT. IF YOU WANT THIS TO BE COMPATIBLE WITH
-# THE REST OF THE PROGRAM, YOU'LL HAVE TO CONVERT SOME OF THE COLUMN VALUES
+from bin.html_strippers import DEFAULT_HTML_BACKEND
+from bin.roam_schema import get_converters
+from bin.xlsx_to_objects import clean_json
 
 
-def clean_csv(filepath):
+def convert_csv_to_objects(filepath, columns=None, schema=None, clean=False, remove_newline=False, html_backend=DEFAULT_HTML_BACKEND):
     """
-    USE XLSX INSTEAD.
-    This method removes compatiblity characters and HTML tags from the CSV file (e.g., /xa0, /xa03)
+    This method converts a CSV file to a list of python objects.
 
-    Input: Filepath of CSV file to clean
-    Output: Filepath of cleaned CSV file, same filename but with .csv_cleaned at the end.
+    Input: Filepath of CSV, columns (optional, only these columns are kept), schema (optional, column types),
+    clean=True/False (parameter to clean compatibility characters + HTML from the values or not),
+    remove_newline and html_backend (only used if clean=True)
+    Output: Array of Python Objects representing CSV rows
     """
-    cleaned_file_path = filepath + "_cleaned"
-
-    with open(filepath, newline='', encoding='utf-8-sig') as csvfile:
-        # Remove special characters from the csv file
-        compatibility_removed_file_text = unicodedata.normalize(
-            'NFKD', csvfile.read())
-        html_cleaned_file_text = BeautifulSoup(
-            compatibility_removed_file_text, 'html.parser').get_text()
-
-        # Write the cleaned text to a file.
-        with open(cleaned_file_path, 'w', newline='', encoding='utf-8') as cleaned_file:
-            cleaned_file.write(html_cleaned_file_text)
-
-    # Return the filepath of the cleaned file
-    return cleaned_file_path
+    return list(iter_csv_rows(filepath, columns, schema, clean, remove_newline, html_backend))
 
 
-def convert_csv_to_objects(filepath, clean=False):
+def iter_csv_rows(filepath, columns=None, schema=None, clean=False, remove_newline=False, html_backend=DEFAULT_HTML_BACKEND):
     """
-    USE XLSX INSTEAD.
-    This method converts a CSV file to a list of python objects.
+    This method streams the rows of a CSV file as python objects, one row at a time.
 
-    Input: Filepath of CSV, clean=True/False (parameter to clean compatibility characters + HTML from the file or not)
-    Output: Array of Python Objects representing CSV rows
+    Every CSV value is a string, so missing values are empty strings. If schema is given, the columns in it
+    are converted to their declared type (see bin.roam_schema), the same way iter_xlsx_rows does, so a CSV
+    export gives the same rows as an XLSX export. Cleaning, if turned on, is done row by row, so no cleaned
+    copy of the file is written.
+
+    Input: Filepath of CSV, columns (optional, only these columns are kept), schema (optional, dict of
+    column name -> column type), clean=True/False (parameter to clean compatibility characters + HTML from
+    the values or not), remove_newline and html_backend (only used if clean=True)
+    Output: Generator of Python Objects representing CSV rows
     """
-    objects = []
-    file_to_run = filepath
+    converters = get_converters(schema)
 
-    # Clean the file from special characters if clean is true
-    if clean == True:
-        file_to_run = clean_csv(filepath)
+    with open(filepath, newline='', encoding='utf-8-sig') as csvfile:
+        csvreader = csv.DictReader(csvfile, restval="")
+        if csvreader.fieldnames is None:
+            return
+        selected_names = [name for name in csvreader.fieldnames
+                          if columns is None or name in columns]
+        typed_names = [name for name in selected_names if name in converters]
 
-    with open(file_to_run, newline='', encoding='utf-8-sig') as csvfile:
-        csvreader = csv.DictReader(csvfile)
         for row in csvreader:
-            objects.append(row)
+            csv_object = {name: row[name] for name in selected_names}
+
+            # Clean before the values are typed, while they're all still strings
+            if clean == True:
+                csv_object = clean_json(
+                    csv_object, remove_newline=remove_newline, html_backend=html_backend)
+
+            for name in typed_names:
+                csv_object[name] = converters[name](csv_object[name])
 
-    return objects
\ No newline at end of file
+            yield csv_object
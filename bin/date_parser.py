@@ -0,0 +1,79 @@
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+from openpyxl.utils.datetime import from_excel
+
+# Date formats found in ROAM exports. Each string is matched against these patterns to pick its parser,
+# instead of trying every format until one doesn't raise an exception.
+US_DATE_PATTERN = re.compile(r"\s*(\d{1,2})/(\d{1,2})/(\d{4})\s*")
+ISO_DATE_PATTERN = re.compile(
+    r"\s*(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?\s*")
+# Excel serial numbers in strings must have 5 digits (the dates from 1927 to 2173), so that a bare year like "2020"
+# isn't read as a day in 1905
+EXCEL_SERIAL_PATTERN = re.compile(r"\s*\d{5}(?:\.\d+)?\s*")
+
+ALMA_DATE_FORMAT = "%Y%m%d"
+
+# The same few dates are repeated on every license term row, so the results are memoized. The caches are typed, so
+# that True and False (which aren't dates) don't share the entries of 1 and 0.
+DATE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE, typed=True)
+def parse_date(value):
+    """
+    Parse a date from a ROAM export into a datetime.
+
+    Accepts datetimes (including pandas Timestamps), dates, Excel serial numbers (as numbers or strings),
+    and strings in MM/DD/YYYY or YYYY-MM-DD format (optionally followed by a time).
+
+    Input: Date value
+    Output: datetime. Raises a ValueError if the value isn't a date in one of the accepted formats.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _parse_excel_serial(value)
+    if isinstance(value, str):
+        match = US_DATE_PATTERN.fullmatch(value)
+        if match:
+            month, day, year = match.groups()
+            return datetime(int(year), int(month), int(day))
+
+        match = ISO_DATE_PATTERN.fullmatch(value)
+        if match:
+            year, month, day = match.groups()
+            return datetime(int(year), int(month), int(day))
+
+        if EXCEL_SERIAL_PATTERN.fullmatch(value):
+            return _parse_excel_serial(float(value))
+
+    raise ValueError("Not a date in a known format: " + repr(value))
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE, typed=True)
+def convert_date_to_alma(value):
+    """
+    Convert a date from a ROAM export to the Alma format YYYYMMDD. Empty strings are left empty.
+
+    Input: Date value (see parse_date for the accepted formats)
+    Output: Date string in YYYYMMDD format. Raises a ValueError if the value can't be parsed.
+    """
+    if isinstance(value, str) and value == "":
+        return value
+    return parse_date(value).strftime(ALMA_DATE_FORMAT)
+
+
+def _parse_excel_serial(serial):
+    """
+    Convert an Excel serial date number (days since 1900, as Excel counts them) to a datetime
+
+    Input: Serial number
+    Output: datetime
+    """
+    if serial < 1:
+        raise ValueError("Not an Excel date serial number: " + repr(serial))
+    return from_excel(serial)
@@ -0,0 +1,74 @@
+import heapq
+import pickle
+import tempfile
+
+# Number of items sorted in memory at a time, before they're written to disk as a sorted run
+DEFAULT_MAX_ITEMS_IN_MEMORY = 100000
+
+
+def external_sort(items, key=None, max_items_in_memory=DEFAULT_MAX_ITEMS_IN_MEMORY, temp_folder=None):
+    """
+    Sort items that may not fit in memory, streaming them out in order
+
+    Items are collected max_items_in_memory at a time, sorted, and pickled to a temporary file (a 'run'). The runs
+    are then merged in one pass, holding one item per run in memory. If there are no more than max_items_in_memory
+    items, they're simply sorted in memory. The sort is stable, and the temporary files are deleted when the
+    generator finishes (or is closed).
+
+    Input: Iterable of items (must be picklable), key (optional, as for sorted), max_items_in_memory (optional),
+    temp_folder (optional, folder for the temporary files; the system default if None)
+    Output: Generator of the items in sorted order
+    """
+    runs = []
+    try:
+        buffer = []
+        for item in items:
+            buffer.append(item)
+            if len(buffer) >= max_items_in_memory:
+                buffer.sort(key=key)
+                runs.append(_write_run(buffer, temp_folder))
+                buffer = []
+
+        buffer.sort(key=key)
+        if not runs:
+            yield from buffer
+            return
+
+        if buffer:
+            runs.append(_write_run(buffer, temp_folder))
+            buffer = []
+
+        # For equal keys, merge takes the items of earlier runs first, which keeps the sort stable
+        yield from heapq.merge(*[_read_run(run) for run in runs], key=key)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _write_run(sorted_items, temp_folder):
+    """
+    Write sorted items to a temporary file, one pickle after the other
+
+    Input: Array of sorted items, folder for the temporary file (or None)
+    Output: Temporary file, positioned at its start
+    """
+    run = tempfile.TemporaryFile(dir=temp_folder)
+    for item in sorted_items:
+        # Each item is pickled on its own, so that nothing holds on to the items already written
+        pickle.dump(item, run, protocol=pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    """
+    Read the items of a temporary file written by _write_run, one at a time
+
+    Input: Temporary file
+    Output: Generator of the items
+    """
+    while True:
+        try:
+            yield pickle.load(run)
+        except EOFError:
+            return
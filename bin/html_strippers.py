@@ -0,0 +1,106 @@
+from html.parser import HTMLParser
+
+import lxml.html
+from bs4 import BeautifulSoup
+
+# HTML stripping backends, used by the cleaners to remove the HTML tags from a value and decode its HTML
+# entities. Each backend is a function that takes a string and returns its text.
+#
+# beautifulsoup - BeautifulSoup with Python's html.parser. The original behaviour, and the slowest.
+# htmlparser - Python's html.parser directly, without building a BeautifulSoup tree. Gives the same text as
+#   beautifulsoup except for some rare malformed entities.
+# lxml - libxml2's HTML parser. The fastest, but it differs from beautifulsoup on malformed HTML, entities
+#   written without a semicolon, and control characters.
+#
+# Run benchmarks/benchmark_html_backends.py to compare their output and speed on your own data.
+DEFAULT_HTML_BACKEND = "beautifulsoup"
+
+
+def strip_html_beautifulsoup(value):
+    """
+    Strip HTML from a string using BeautifulSoup and html.parser
+
+    Input: String
+    Output: Text of the string
+    """
+    return BeautifulSoup(value, 'html.parser').get_text()
+
+
+class _TextExtractor(HTMLParser):
+    """html.parser subclass that collects the text of a document, leaving out the contents of
+    script and style elements (as BeautifulSoup's get_text does)"""
+
+    skipped_elements = ("script", "style")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.text_parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skipped_elements:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.skipped_elements and self.skip_depth > 0:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if self.skip_depth == 0:
+            self.text_parts.append(data)
+
+    def unknown_decl(self, data):
+        # CDATA sections are kept as text
+        if data.startswith("CDATA[") and self.skip_depth == 0:
+            self.text_parts.append(data[len("CDATA["):])
+
+
+def strip_html_htmlparser(value):
+    """
+    Strip HTML from a string using Python's html.parser directly
+
+    Input: String
+    Output: Text of the string
+    """
+    parser = _TextExtractor()
+    parser.feed(value)
+    parser.close()
+    return "".join(parser.text_parts)
+
+
+def strip_html_lxml(value):
+    """
+    Strip HTML from a string using lxml's HTML parser
+
+    Input: String
+    Output: Text of the string
+    """
+    if value == "":
+        return value
+
+    fragment = lxml.html.fragment_fromstring(value, create_parent="div")
+    for element in list(fragment.iter("script", "style")):
+        # Keep the text after the element
+        element.drop_tree()
+
+    return fragment.text_content()
+
+
+HTML_STRIPPERS = {
+    "beautifulsoup": strip_html_beautifulsoup,
+    "htmlparser": strip_html_htmlparser,
+    "lxml": strip_html_lxml
+}
+
+
+def get_html_stripper(html_backend):
+    """
+    Get the HTML stripping function of a backend
+
+    Input: Name of the backend (see HTML_STRIPPERS)
+    Output: HTML stripping function
+    """
+    if html_backend not in HTML_STRIPPERS:
+        raise ValueError("Unknown HTML backend '" + str(html_backend) + "'. Choose one of: " +
+                         ", ".join(HTML_STRIPPERS))
+    return HTML_STRIPPERS[html_backend]
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Ways of giving each license its Alma license code (Settings.license_code_strategy)
+# counter - number the licenses in the order of the license file (ROAM-0, ROAM-1, ...). A license's code changes
+#   whenever the licenses before it change.
+# hash - a hash of the license name and start date (ROAM-3F2A...). Always the same for the same license, with
+#   nothing to keep between runs.
+# registry - number the licenses, but remember each license's code in Settings.license_code_registry, so that it
+#   keeps its code in later runs. New licenses get the next unused number.
+LICENSE_CODE_STRATEGIES = ("counter", "hash", "registry")
+DEFAULT_LICENSE_CODE_STRATEGY = "counter"
+
+# Number of hex digits of the hash in the codes of the "hash" strategy
+HASH_CODE_LENGTH = 12
+
+# Bump this whenever the format of the registry file changes
+REGISTRY_VERSION = 1
+
+
+def hash_license_code(prefix, license_name, start_date):
+    """
+    Get the license code of the "hash" strategy: the prefix and a hash of the license name and start date
+
+    Input: Code prefix, license name, start date
+    Output: License code
+    """
+    license_key = str(license_name) + "\x1f" + str(start_date)
+    digest = hashlib.sha256(license_key.encode("utf-8")).hexdigest()
+    return prefix + "-" + digest[:HASH_CODE_LENGTH].upper()
+
+
+class LicenseCodeRegistry():
+    """
+    Codes given to licenses (by license name and start date), kept in a JSON file between runs
+
+    The codes are read once, so looking a license up is a dict lookup. Licenses that aren't in the registry yet
+    are given the next unused number, while the registry file is locked: the file is read again (to pick up codes
+    given by other processes in the meantime), the new codes are added, and it's replaced in one go. So processes
+    sharing a registry file never give out the same code, and a license always keeps the first code it got.
+    """
+
+    def __init__(self, filepath, prefix):
+        self.filepath = filepath
+        self.prefix = prefix
+        self.codes, self.next_number = _read_registry(filepath)
+
+    def get_code(self, license_name, start_date):
+        """
+        Get the code of a license, giving it a new one if it's not in the registry
+
+        Input: License name, start date
+        Output: License code
+        """
+        license_key = (str(license_name), str(start_date))
+        code = self.codes.get(license_key)
+        if code is None:
+            self.reserve_codes([license_key])
+            code = self.codes[license_key]
+        return code
+
+    def reserve_codes(self, license_keys):
+        """
+        Give codes to all the licenses that aren't in the registry yet, in order, and save them in the registry file.
+        The file is only written once, however many licenses are new.
+
+        Input: Iterable of (license name, start date) tuples
+        Output: None
+        """
+        new_license_keys = [license_key for license_key in dict.fromkeys(
+            (str(license_name), str(start_date)) for license_name, start_date in license_keys)
+            if license_key not in self.codes]
+        if not new_license_keys:
+            return
+
+        folder = os.path.dirname(self.filepath)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with _locked(self.filepath + ".lock"):
+            self.codes, self.next_number = _read_registry(self.filepath)
+            for license_key in new_license_keys:
+                if license_key not in self.codes:
+                    self.codes[license_key] = self.prefix + "-" + str(self.next_number)
+                    self.next_number += 1
+            _write_registry(self.filepath, self.codes, self.next_number)
+
+
+def _read_registry(filepath):
+    """
+    Read a registry file
+
+    Input: Filepath of the registry
+    Output: Dict of (license name, start date) -> code, next unused number (empty and 0 if there's no file)
+    """
+    if not os.path.isfile(filepath):
+        return {}, 0
+
+    with open(filepath, encoding="utf-8") as registry_file:
+        registry = json.load(registry_file)
+    if registry.get("version") != REGISTRY_VERSION:
+        raise ValueError("License code registry " + filepath + " has an unknown version: " +
+                         str(registry.get("version")))
+
+    codes = {(entry["name"], entry["start_date"]): entry["code"] for entry in registry["licenses"]}
+    return codes, registry["next_number"]
+
+
+def _write_registry(filepath, codes, next_number):
+    """
+    Write a registry file. It's written to a temporary file first, so that readers never see a half-written
+    registry.
+
+    Input: Filepath of the registry, dict of (license name, start date) -> code, next unused number
+    Output: None
+    """
+    registry = {
+        "version": REGISTRY_VERSION,
+        "next_number": next_number,
+        "licenses": [{"name": license_name, "start_date": start_date, "code": code}
+                     for (license_name, start_date), code in codes.items()]
+    }
+
+    temporary_path = filepath + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as registry_file:
+        json.dump(registry, registry_file, indent=1, ensure_ascii=False)
+    os.replace(temporary_path, filepath)
+
+
+@contextmanager
+def _locked(lock_path):
+    """
+    Hold an exclusive lock on a lock file, waiting for other processes to release it
+
+    Input: Path of the lock file
+    Output: None
+    """
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,132 @@
+# The license details of a License, in the order the XSD (and generateDS) puts them in. They're written as the
+# license_details elements of the same name (see bin/license_serializers.py), and None values are left out.
+LICENSE_DETAILS_ELEMENTS = ["license_code", "license_name", "license_status", "start_date", "end_date",
+                            "review_status", "URI", "type"]
+
+
+class LicenseTerm():
+    """A term of a license: an Alma term code and its value"""
+    __slots__ = ("term_code", "term_value")
+
+    def __init__(self, term_code, term_value):
+        self.term_code = term_code
+        self.term_value = term_value
+
+    def __eq__(self, other):
+        return isinstance(other, LicenseTerm) and (self.term_code, self.term_value) == (other.term_code, other.term_value)
+
+    def __hash__(self):
+        return hash((self.term_code, self.term_value))
+
+    def __repr__(self):
+        return "LicenseTerm({!r}, {!r})".format(self.term_code, self.term_value)
+
+
+class LicenseNote():
+    """A note of a license. Notes are created by the same entity as their license."""
+    __slots__ = ("content",)
+
+    def __init__(self, content):
+        self.content = content
+
+    def __eq__(self, other):
+        return isinstance(other, LicenseNote) and self.content == other.content
+
+    def __hash__(self):
+        return hash(self.content)
+
+    def __repr__(self):
+        return "LicenseNote({!r})".format(self.content)
+
+
+class License():
+    """
+    A combined license, as it's written to XML: the license details, and tuples of its terms and notes
+
+    The attributes are named after the XML elements (see bin/license_serializers.py), and None means the element is
+    left out (as end_date is for licenses without one). It holds the same as a combined license dict (see
+    RoamAlmaInterface.combine_roam_license_and_license_terms) in far less memory: there's no dict per license,
+    term and note, and equal terms and notes can be shared between licenses (see from_converted_license).
+    """
+    __slots__ = ("created_by", "license_code", "license_name", "license_status", "start_date", "end_date",
+                 "review_status", "URI", "type", "terms", "notes")
+
+    def __init__(self, created_by, license_code, license_name, license_status, start_date, end_date=None,
+                 review_status=None, URI=None, type=None, terms=(), notes=()):
+        self.created_by = created_by
+        self.license_code = license_code
+        self.license_name = license_name
+        self.license_status = license_status
+        self.start_date = start_date
+        self.end_date = end_date
+        self.review_status = review_status
+        self.URI = URI
+        self.type = type
+        self.terms = tuple(terms)
+        self.notes = tuple(notes)
+
+    def __eq__(self, other):
+        return isinstance(other, License) and all(
+            getattr(self, attribute) == getattr(other, attribute) for attribute in License.__slots__)
+
+    def __repr__(self):
+        return "License({})".format(", ".join(
+            "{}={!r}".format(attribute, getattr(self, attribute)) for attribute in License.__slots__))
+
+    @staticmethod
+    def from_converted_license(converted_license, shared_objects=None):
+        """
+        Create a License from a combined license dict
+
+        Input: Combined license dict, shared_objects (optional dict; terms and notes equal to one already in it are
+        replaced by that one, and new ones are added, so pass the same dict for all the licenses of a run)
+        Output: License
+        """
+        if shared_objects is None:
+            shared_objects = {}
+
+        license_details = converted_license["license_details"]
+        terms = []
+        for converted_term in converted_license["term_list"]:
+            term = LicenseTerm(converted_term["term_code"], converted_term["term_value"])
+            terms.append(shared_objects.setdefault(term, term))
+        notes = []
+        for converted_note in converted_license["note_list"]:
+            note = LicenseNote(converted_note["content"])
+            notes.append(shared_objects.setdefault(note, note))
+
+        return License(license_details["ownered_entity"]["created_by"], license_details.get("license_code"),
+                       license_details.get("license_name"), license_details.get("license_status"),
+                       license_details.get("start_date"), license_details.get("end_date"),
+                       license_details.get("review_status"), license_details.get("URI"),
+                       license_details.get("type"), terms, notes)
+
+    def to_converted_license(self):
+        """
+        Get the combined license dict of the License
+
+        Input: None
+        Output: Combined license dict
+        """
+        license_details = {"ownered_entity": {"created_by": self.created_by}}
+        for attribute in LICENSE_DETAILS_ELEMENTS:
+            if getattr(self, attribute) is not None:
+                license_details[attribute] = getattr(self, attribute)
+
+        return {
+            "license_details": license_details,
+            "term_list": [{"term_code": term.term_code, "term_value": term.term_value} for term in self.terms],
+            "note_list": [{"content": note.content} for note in self.notes]
+        }
+
+
+def as_license_model(converted_license, shared_objects=None):
+    """
+    Get a combined license as a License, converting it if it's a dict
+
+    Input: License or combined license dict, shared_objects (optional, see License.from_converted_license)
+    Output: License
+    """
+    if isinstance(converted_license, License):
+        return converted_license
+    return License.from_converted_license(converted_license, shared_objects)
@@ -0,0 +1,233 @@
+from functools import lru_cache
+
+from lxml import etree
+
+from bin.license_class import quote_xml
+from bin.license_model import LICENSE_DETAILS_ELEMENTS, as_license_model
+
+# Ways of writing a combined license (Settings.xml_serializer) as an Alma license XML file
+#
+# generateds - build the generateDS classes of bin/license_class.py, and export them. The original behaviour.
+# lxml - build the XML straight from the combined license with lxml, and serialize it in C. Faster, and gives
+#   the same XML as generateds.
+# template - fill precompiled string templates with the (escaped) values of the combined license. The fastest,
+#   and gives the same XML as generateds.
+#
+# Each of them writes the XML indented, as generateDS does by default, or compact, on one line
+# (Settings.compact_xml).
+XML_SERIALIZERS = ("generateds", "lxml", "template")
+DEFAULT_XML_SERIALIZER = "generateds"
+
+LICENSE_NAMESPACE = "http://com/exlibris/urm/repository/migration/license/xmlbeans"
+
+# Indentation of each level, as generateDS writes it
+INDENT = "    "
+
+# Number of distinct <term> fragments the template serializer remembers. Most terms (a code and a value like
+# PERMITTED) repeat across licenses.
+TERM_FRAGMENT_CACHE_SIZE = 8192
+
+
+def serialize_license_lxml(converted_license, compact=False):
+    """
+    Serialize a combined license to Alma license XML with lxml
+
+    The XML is the same as exporting the generateDS instance of the license: the same elements, in the same
+    order, indented the same way (or not at all, if compact), and without an XML declaration.
+
+    Input: Combined license (License, or dict, see RoamAlmaInterface.combine_roam_license_and_license_terms),
+    compact (optional)
+    Output: UTF-8 encoded XML (bytes)
+    """
+    license_model = as_license_model(converted_license)
+
+    # Only the root element declares the (default) namespace, and the elements are created without one. They're
+    # serialized the same as namespaced elements, which take much longer to create. So the elements must not be
+    # used as a tree (or validated) before they're serialized.
+    license_element = etree.Element("license", nsmap={None: LICENSE_NAMESPACE})
+
+    license_details_element = etree.SubElement(license_element, "license_details")
+    _add_ownered_entity(license_details_element, license_model.created_by)
+    for element_name in LICENSE_DETAILS_ELEMENTS:
+        _add_text_element(license_details_element, element_name, getattr(license_model, element_name))
+
+    # Terms and notes are only added if there are any
+    if len(license_model.terms) > 0:
+        term_list_element = etree.SubElement(license_element, "term_list")
+        for term in license_model.terms:
+            term_element = etree.SubElement(term_list_element, "term")
+            _add_text_element(term_element, "term_code", term.term_code)
+            _add_text_element(term_element, "term_value", term.term_value)
+
+    if len(license_model.notes) > 0:
+        note_list_element = etree.SubElement(license_element, "note_list")
+        for note in license_model.notes:
+            note_element = etree.SubElement(note_list_element, "note")
+            # Notes are created by the same entity as the license
+            _add_ownered_entity(note_element, license_model.created_by)
+            _add_text_element(note_element, "content", note.content)
+
+    if compact:
+        return etree.tostring(license_element, encoding="utf-8")
+
+    etree.indent(license_element, space=INDENT)
+    return etree.tostring(license_element, encoding="utf-8") + b"\n"
+
+
+def _add_ownered_entity(parent_element, created_by):
+    ownered_entity_element = etree.SubElement(parent_element, "ownered_entity")
+    _add_text_element(ownered_entity_element, "created_by", created_by)
+
+
+def _add_text_element(parent_element, element_name, value):
+    # Like generateDS, None values are left out, and other empty values (including 0) are written as an empty
+    # start and end tag
+    if value is None:
+        return
+    etree.SubElement(parent_element, element_name).text = str(value) if value else ""
+
+
+def serialize_license_template(converted_license, compact=False):
+    """
+    Serialize a combined license to Alma license XML with the precompiled templates
+
+    The XML is the same as serialize_license_lxml writes. Values are escaped with escape_xml, and the <term>
+    elements are memoized (see _term_fragment). The XML is joined into one string and encoded once.
+
+    Input: Combined license (License, or dict, see RoamAlmaInterface.combine_roam_license_and_license_terms),
+    compact (optional)
+    Output: UTF-8 encoded XML (bytes)
+    """
+    templates = COMPACT_TEMPLATES if compact else INDENTED_TEMPLATES
+    license_model = as_license_model(converted_license)
+
+    parts = [templates["license_start"], templates["license_details_start"],
+             _ownered_entity(templates, "license_details_ownered_entity", license_model.created_by)]
+    for element_name in LICENSE_DETAILS_ELEMENTS:
+        parts.append(_text_element(templates, element_name, getattr(license_model, element_name)))
+    parts.append(templates["license_details_end"])
+
+    # Terms and notes are only added if there are any
+    if len(license_model.terms) > 0:
+        parts.append(templates["term_list_start"])
+        for term in license_model.terms:
+            parts.append(_term_fragment(term.term_code, term.term_value, compact))
+        parts.append(templates["term_list_end"])
+
+    if len(license_model.notes) > 0:
+        # Notes are created by the same entity as the license
+        note_start = templates["note_start"] + _ownered_entity(
+            templates, "note_ownered_entity", license_model.created_by)
+        parts.append(templates["note_list_start"])
+        for note in license_model.notes:
+            parts.append(note_start)
+            parts.append(_text_element(templates, "content", note.content))
+            parts.append(templates["note_end"])
+        parts.append(templates["note_list_end"])
+
+    parts.append(templates["license_end"])
+    return "".join(parts).encode("utf-8")
+
+
+def escape_xml(value):
+    """
+    Escape a value for the text of an element, as generateDS does (see license_class.quote_xml)
+
+    Most values have nothing to escape, and are returned as they are. Only values with a '&', '<' or '>' (which
+    covers CDATA sections and ']]>') go through quote_xml.
+
+    Input: Value
+    Output: Escaped string ('' for empty values, including 0)
+    """
+    if not value:
+        return ""
+    if not isinstance(value, str):
+        value = str(value)
+    if "&" in value or "<" in value or ">" in value:
+        return quote_xml(value)
+    return value
+
+
+def _compile_templates(compact):
+    """
+    Compile the templates of the elements of a license, indented as generateDS does (or not at all, if compact)
+
+    Templates of elements with a value are (start, end) tuples, with the value going in between. If the value is
+    None, the element is left out (see _text_element). The ownered_entity templates are for its created_by, with
+    the empty element to write if created_by is None.
+
+    Input: compact
+    Output: Dict of element name (or name of a fragment) -> template
+    """
+    def line(level, start, end=""):
+        if compact:
+            return start, end
+        return INDENT * level + start, end + "\n"
+
+    def tag_line(level, tag):
+        return "".join(line(level, tag))
+
+    def text_element(level, element_name):
+        return line(level, "<" + element_name + ">", "</" + element_name + ">")
+
+    def ownered_entity(level):
+        created_by_start, created_by_end = text_element(level + 1, "created_by")
+        return (tag_line(level, "<ownered_entity>") + created_by_start,
+                created_by_end + tag_line(level, "</ownered_entity>"),
+                tag_line(level, "<ownered_entity/>"))
+
+    templates = {
+        "license_start": tag_line(0, '<license xmlns="' + LICENSE_NAMESPACE + '">'),
+        "license_end": tag_line(0, "</license>"),
+        "license_details_start": tag_line(1, "<license_details>"),
+        "license_details_end": tag_line(1, "</license_details>"),
+        "license_details_ownered_entity": ownered_entity(2),
+        "term_list_start": tag_line(1, "<term_list>"),
+        "term_list_end": tag_line(1, "</term_list>"),
+        "term_start": tag_line(2, "<term>"),
+        "term_end": tag_line(2, "</term>"),
+        "term_code": text_element(3, "term_code"),
+        "term_value": text_element(3, "term_value"),
+        "note_list_start": tag_line(1, "<note_list>"),
+        "note_list_end": tag_line(1, "</note_list>"),
+        "note_start": tag_line(2, "<note>"),
+        "note_end": tag_line(2, "</note>"),
+        "note_ownered_entity": ownered_entity(3),
+        "content": text_element(3, "content")
+    }
+    for element_name in LICENSE_DETAILS_ELEMENTS:
+        templates[element_name] = text_element(2, element_name)
+
+    return templates
+
+
+INDENTED_TEMPLATES = _compile_templates(compact=False)
+COMPACT_TEMPLATES = _compile_templates(compact=True)
+
+
+def _text_element(templates, template_name, value):
+    # Like generateDS, None values are left out
+    if value is None:
+        return ""
+    start, end = templates[template_name]
+    return start + escape_xml(value) + end
+
+
+def _ownered_entity(templates, template_name, created_by):
+    start, end, empty = templates[template_name]
+    if created_by is None:
+        return empty
+    return start + escape_xml(created_by) + end
+
+
+@lru_cache(maxsize=TERM_FRAGMENT_CACHE_SIZE)
+def _term_fragment(term_code, term_value, compact):
+    """
+    Get the XML of a <term> element. Memoized, as most terms repeat across licenses.
+
+    Input: Term code, term value, compact
+    Output: XML string
+    """
+    templates = COMPACT_TEMPLATES if compact else INDENTED_TEMPLATES
+    return (templates["term_start"] + _text_element(templates, "term_code", term_code) +
+            _text_element(templates, "term_value", term_value) + templates["term_end"])
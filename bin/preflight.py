@@ -0,0 +1,128 @@
+from collections import defaultdict
+
+from bin.date_parser import convert_date_to_alma
+from bin.roam_to_alma_interface import RoamAlmaInterface, TermMappingError, normalize_term_key
+
+# The only columns the pre-flight check reads from the ROAM files
+LICENSE_KEY_COLUMNS = ["Name", "Start Date", "End Date"]
+LICENSE_TERMS_KEY_COLUMNS = ["Name", "License Name", "Allowed", "Start Date", "End Date"]
+
+# Maximum number of row numbers listed for each problem
+MAX_REPORTED_ROWS = 10
+
+
+def get_key_schema(schema, key_columns):
+    """
+    Get the part of a ROAM schema that covers the key columns
+
+    Input: Schema (dict of column name -> column type), key column names
+    Output: Schema of the key columns
+    """
+    return {column: schema[column] for column in key_columns if column in schema}
+
+
+def find_input_problems(roam_license_objects, roam_license_term_objects, mappings, xsd_file):
+    """
+    Find the problems that would stop (or spoil) a conversion, without converting anything
+
+    Only the key columns of the rows are looked at. Each distinct value is checked once, and reported with the
+    rows it's on. These are reported:
+    - problems in the term mappings (see RoamAlmaInterface.compile_term_mappings)
+    - ROAM term names that aren't in Mappings.term_mappings
+    - 'Allowed' values that aren't in Mappings.term_value_mappings for the term's main term code
+    - dates that can't be converted to Alma format
+    - license term rows with no license of the same name and start date
+
+    Input: License rows and license term rows (with at least the key columns), Mappings class, filepath of XSD
+    Output: Array of problem messages (empty if no problems were found)
+    """
+    problems = []
+
+    try:
+        term_plan = RoamAlmaInterface.compile_term_mappings(mappings, xsd_file)
+    except TermMappingError as e:
+        problems.extend(e.problems)
+        term_plan = None
+
+    license_start_dates = _convert_dates(
+        roam_license_objects, "licenses", problems)
+    license_term_start_dates = _convert_dates(
+        roam_license_term_objects, "license terms", problems)
+
+    if term_plan is not None:
+        unmapped_term_rows = defaultdict(list)
+        unmapped_value_rows = defaultdict(list)
+        for row_index, roam_object in enumerate(roam_license_term_objects):
+            plan_entry = term_plan.get(normalize_term_key(roam_object["Name"]))
+            if plan_entry is None:
+                unmapped_term_rows[roam_object["Name"]].append(row_index)
+                continue
+
+            main_term_code, _, value_mapping = plan_entry
+            if main_term_code != "" and normalize_term_key(roam_object["Allowed"]) not in value_mapping:
+                unmapped_value_rows[(roam_object["Name"], roam_object["Allowed"], main_term_code)].append(
+                    row_index)
+
+        for roam_term_name, row_indexes in unmapped_term_rows.items():
+            problems.append("ROAM term '{}' isn't in Mappings.term_mappings (license terms {})".format(
+                roam_term_name, _format_rows(row_indexes)))
+        for (roam_term_name, roam_term_allowed, main_term_code), row_indexes in unmapped_value_rows.items():
+            problems.append("Allowed value '{}' of ROAM term '{}' isn't in Mappings.term_value_mappings['{}'] "
+                            "(license terms {})".format(roam_term_allowed, roam_term_name, main_term_code,
+                                                        _format_rows(row_indexes)))
+
+    # License terms are matched to their license by name and start date. Rows with a bad start date were
+    # already reported above
+    license_keys = {(roam_object["Name"], start_date)
+                    for roam_object, start_date in zip(roam_license_objects, license_start_dates)}
+    orphan_rows = defaultdict(list)
+    for row_index, (roam_object, start_date) in enumerate(zip(roam_license_term_objects, license_term_start_dates)):
+        key = (roam_object["License Name"], start_date)
+        if start_date is not None and key not in license_keys:
+            orphan_rows[key].append(row_index)
+
+    for (license_name, start_date), row_indexes in orphan_rows.items():
+        problems.append("No license named '{}' with start date {!r} for license terms {}".format(
+            license_name, start_date, _format_rows(row_indexes)))
+
+    return problems
+
+
+def _convert_dates(roam_objects, sheet_name, problems):
+    """
+    Convert the dates of the rows to Alma format (without changing the rows), adding a problem for every
+    distinct date that can't be converted
+
+    Input: Rows, name of the sheet (for the messages), array of problems to add to
+    Output: Array of the converted start dates of the rows (None where it can't be converted)
+    """
+    bad_date_rows = defaultdict(list)
+    start_dates = []
+    for row_index, roam_object in enumerate(roam_objects):
+        for property in ["Start Date", "End Date"]:
+            try:
+                converted_date = convert_date_to_alma(roam_object[property])
+            except (ValueError, TypeError):
+                converted_date = None
+                bad_date_rows[(property, roam_object[property])].append(row_index)
+            if property == "Start Date":
+                start_dates.append(converted_date)
+
+    for (property, value), row_indexes in bad_date_rows.items():
+        problems.append("{} {!r} can't be converted to Alma format ({} {})".format(
+            property, value, sheet_name, _format_rows(row_indexes)))
+
+    return start_dates
+
+
+def _format_rows(row_indexes):
+    """
+    Format row indexes as the spreadsheet row numbers (the header is row 1)
+
+    Input: Array of row indexes
+    Output: String listing the row numbers
+    """
+    row_numbers = [str(row_index + 2) for row_index in row_indexes[:MAX_REPORTED_ROWS]]
+    if len(row_indexes) > MAX_REPORTED_ROWS:
+        row_numbers.append("and {} more".format(len(row_indexes) - MAX_REPORTED_ROWS))
+    return ("row " if len(row_indexes) == 1 else "rows ") + ", ".join(row_numbers)
@@ -0,0 +1,78 @@
+from bin.date_parser import parse_date
+
+# Column types a schema can give a column. A schema is a dict of column name -> column type, and is
+# applied by the XLSX and CSV readers while they parse the rows, instead of leaving the values to whatever
+# type the file format (or pandas) would have inferred for them.
+STRING = "string"
+BOOLEAN = "boolean"
+DATE = "date"
+
+TRUE_STRINGS = {"true", "yes", "1"}
+
+
+def convert_string(value):
+    """
+    Convert a parsed cell value to a string. Blank cells become empty strings, and whole numbers
+    don't get a decimal point (e.g., 6.0 becomes '6')
+
+    Input: Cell value
+    Output: String
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def convert_boolean(value):
+    """
+    Convert a parsed cell value to a boolean. True, 1, and the strings 'true', 'yes' and '1' (in any case)
+    are True; anything else, including blank cells, is False.
+
+    Input: Cell value
+    Output: Boolean
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_STRINGS
+    return value == 1
+
+
+def convert_date(value):
+    """
+    Convert a parsed cell value to a datetime. Blank cells become empty strings. Dates in the formats
+    bin.date_parser accepts (including Excel serial numbers) are parsed; other values are left as they are,
+    so that they can be reported when the dates are converted to Alma format.
+
+    Input: Cell value
+    Output: datetime, empty string, or the original value
+    """
+    if value is None or value == "":
+        return ""
+    try:
+        return parse_date(value)
+    except (ValueError, TypeError):
+        return value
+
+
+CONVERTERS = {
+    STRING: convert_string,
+    BOOLEAN: convert_boolean,
+    DATE: convert_date
+}
+
+
+def get_converters(schema):
+    """
+    Get the converter function of each column in a schema
+
+    Input: Schema (dict of column name -> column type), or None
+    Output: Dict of column name -> converter function
+    """
+    if schema is None:
+        return {}
+    return {column: CONVERTERS[column_type] for column, column_type in schema.items()}
@@ -1,26 +1,108 @@
-from datetime import datetime
+import io
 import os
 import re
 import logging
 import json
-
-from pandas import Timestamp
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
+
+from bin.date_parser import convert_date_to_alma
+from bin.external_sort import DEFAULT_MAX_ITEMS_IN_MEMORY, external_sort
+from bin.license_codes import DEFAULT_LICENSE_CODE_STRATEGY, LICENSE_CODE_STRATEGIES, LicenseCodeRegistry, hash_license_code
+from bin.license_serializers import DEFAULT_XML_SERIALIZER, XML_SERIALIZERS, serialize_license_lxml, serialize_license_template
+from bin.license_model import as_license_model
 from bin.license_class import license, license_details, note, note_list, term, term_list, ownered_entity
-import xmlschema
+from bin.roam_schema import BOOLEAN, DATE, STRING
+from bin.xml_validators import DEFAULT_VALIDATION_BACKEND, VALIDATION_BACKENDS, XML_VALIDATION_ERRORS, validate_xml
+import xml.etree.ElementTree as ET
+
+XSD_NAMESPACE = "{http://www.w3.org/2001/XMLSchema}"
+
+# Ways of matching the licenses with their license terms (Settings.join_strategy)
+# hash - index the license terms by license name and start date. Fast, but keeps every license term in memory.
+# sort_merge - sort the licenses and license terms by license name and start date, and merge them. Slower, but
+#   the license terms are sorted on disk once there are more than Settings.join_max_rows_in_memory of them.
+JOIN_STRATEGIES = ("hash", "sort_merge")
+DEFAULT_JOIN_STRATEGY = "hash"
+
+# The RoamAlmaInterface of a worker process of RoamAlmaInterface.export_validate_licenses_parallel, created once per
+# worker by RoamAlmaInterface.init_export_worker and used for all of its shards
+_export_worker_interface = None
+
+
+class DateConversionError(ValueError):
+    """Raised when dates can't be converted to Alma format. failures holds a (row index, property name, value)
+    tuple for every date that couldn't be converted."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__("{} date(s) could not be converted to Alma format: ".format(len(failures)) +
+                         "; ".join("row {} '{}': {!r}".format(row_index, property, value)
+                                   for row_index, property, value in failures))
+
+
+class TermMappingError(ValueError):
+    """Raised when the term mappings in Mappings are invalid, or a ROAM term can't be mapped with them. problems
+    holds a message for every problem found."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("{} term mapping problem(s): ".format(len(problems)) + "; ".join(problems))
+
+
+def normalize_term_key(value):
+    """Normalize a ROAM term name or Allowed value, so that they're matched regardless of case and surrounding spaces
+
+    Input: Term name or Allowed value
+    Output: Normalized string"""
+    return str(value).strip().casefold()
 
 
 class RoamAlmaInterface():
 
+    # The ROAM columns read by __convert_roam_license_object and __convert_roam_license_terms_object, and the
+    # type each one is converted to while parsing. Only these columns (plus any additional ones listed in
+    # Mappings) are parsed from the ROAM exports. If you make a conversion function read a new column, add it
+    # here or in Mappings.
+    license_schema = {
+        "Name": STRING,
+        "Start Date": DATE,
+        "End Date": DATE,
+        "License Links": STRING
+    }
+    license_terms_schema = {
+        "Name": STRING,
+        "License Name": STRING,
+        "Start Date": DATE,
+        "End Date": DATE,
+        "Active": BOOLEAN,
+        "Allowed": STRING,
+        "License Qualifiers": STRING,
+        "Description": STRING,
+        "License Summary": STRING,
+        "License Notes": STRING,
+        "Publisher": STRING,
+        "License Links": STRING
+    }
+
     def __init__(self, roam_license_objects, roam_license_term_objects, mappings, settings):
         self.roam_license_objects = roam_license_objects
         self.roam_license_term_objects = roam_license_term_objects
-        self.term_mapping = mappings.term_mappings
-        self.term_value_mapping = mappings.term_value_mappings
         self.mappings = mappings
         self.settings = settings
 
+        # The term mappings are compiled (and checked) once, rather than looked up for every term row
+        self.term_plan = RoamAlmaInterface.compile_term_mappings(
+            mappings, settings.xsd_file)
+
         self.namespace = 'xmlns="http://com/exlibris/urm/repository/migration/license/xmlbeans"'
 
+        # The license summary, license notes, publisher and notes array of the last notes built. See
+        # __convert_license_notes
+        self.last_note_list = None
+
         # Set empty vars for converted objects
         self.converted_roam_license_terms = None
         self.converted_roam_licenses = None
@@ -33,6 +115,31 @@ class RoamAlmaInterface():
             "counter": 0
         }
 
+        # How license codes are given (see LICENSE_CODE_STRATEGIES). The registry is only opened when the licenses
+        # are converted. license_code_keys holds the license key of every "hash" code given, to catch collisions, and
+        # license_key_counts the number of licenses converted so far with each (license name, start date).
+        self.license_code_strategy = getattr(settings, "license_code_strategy", DEFAULT_LICENSE_CODE_STRATEGY)
+        if self.license_code_strategy not in LICENSE_CODE_STRATEGIES:
+            raise ValueError("Unknown license code strategy '" + str(self.license_code_strategy) +
+                             "'. Choose one of: " + ", ".join(LICENSE_CODE_STRATEGIES))
+        self.license_code_registry = None
+        self.license_code_keys = {}
+        self.license_key_counts = {}
+
+        # How the licenses are written as XML (see XML_SERIALIZERS)
+        self.xml_serializer = getattr(settings, "xml_serializer", DEFAULT_XML_SERIALIZER)
+        if self.xml_serializer not in XML_SERIALIZERS:
+            raise ValueError("Unknown XML serializer '" + str(self.xml_serializer) + "'. Choose one of: " +
+                             ", ".join(XML_SERIALIZERS))
+        # Write the XML on one line, without indentation
+        self.compact_xml = getattr(settings, "compact_xml", False)
+
+        # How the XML is validated against the XSD (see VALIDATION_BACKENDS)
+        self.validation_backend = getattr(settings, "validation_backend", DEFAULT_VALIDATION_BACKEND)
+        if self.validation_backend not in VALIDATION_BACKENDS:
+            raise ValueError("Unknown validation backend '" + str(self.validation_backend) + "'. Choose one of: " +
+                             ", ".join(VALIDATION_BACKENDS))
+
     def get_converted_license_objects(self):
         """Returns converted license objects. Converts them if not already done so.
 
@@ -56,60 +163,53 @@ class RoamAlmaInterface():
         Output: Array of converted ROAM license terms
         """
         if not self.converted_roam_license_terms:
-            self.converted_roam_license_terms = self.convert_roam_license_terms_array(
-                self.roam_license_term_objects)
+            if getattr(self.settings, "group_license_terms", False):
+                self.converted_roam_license_terms = self.convert_roam_license_terms_grouped(
+                    self.roam_license_term_objects)
+            else:
+                self.converted_roam_license_terms = self.convert_roam_license_terms_array(
+                    self.roam_license_term_objects)
 
         return self.converted_roam_license_terms
 
     def combine_roam_license_and_license_terms(self):
         """This method takes all the license term objects and merges their term_list into the respective license
 
-        This function will ignore any license term objects that don't have matching licenses
+        This function will ignore any license term objects that don't have matching licenses. The licenses are
+        matched with their license terms using Settings.join_strategy (see JOIN_STRATEGIES); both give the same
+        licenses.
 
         Input: None
         Output: None (sets internal instance variable)"""
-        license_terms_matched = 0
-
-        logging.info("Combining Roam Licenses and License Terms...")
-        for license in self.converted_roam_licenses:
-            # Get the code of the license to match by
-            target_license_name = license["license_details"]["license_name"]
-            target_license_start_date = license["license_details"]["start_date"]
-
-            logging.debug("Target Name: " + target_license_name)
+        join_strategy = getattr(self.settings, "join_strategy", DEFAULT_JOIN_STRATEGY)
+        if join_strategy not in JOIN_STRATEGIES:
+            raise ValueError("Unknown join strategy '" + str(join_strategy) + "'. Choose one of: " +
+                             ", ".join(JOIN_STRATEGIES))
 
-            # Loop through the license terms to find the matching terms
-            for license_term_object in self.converted_roam_license_terms:
+        if join_strategy == "sort_merge":
+            # The licenses are combined in place, so there's nothing to do with them here
+            for _ in self.iter_merge_joined_licenses(self.converted_roam_licenses, self.converted_roam_license_terms):
+                pass
+            return
 
-                # If the license names are a match,
-                # AND the start dates are a match
-                # add the license terms to the original license
-                if (license_term_object["license_details"]["license_name"] == target_license_name) and (license_term_object["license_details"]["start_date"] == target_license_start_date):
-
-                    # Set a variable that it's matched, for logging purposes, or increment it if its not there
-                    if "matched" in license_term_object:
-                        license_term_object["matched"] += 1
-                    else:
-                        license_term_object["matched"] = 1
+        license_terms_matched = 0
 
-                    # Increment the 'matched' variable
-                    license_terms_matched += 1
-                    for license_term in license_term_object["term_list"]:
-                        license["term_list"].append(license_term)
+        logging.info("Combining Roam Licenses and License Terms...")
 
-                    # If the license notes are empty, add them
-                    if len(license['note_list']) == 0:
-                        license['note_list'] = license_term_object['note_list']
+        # Index the license terms by the key they're matched on, keeping their order
+        license_terms_by_key = {}
+        for license_term_object in self.converted_roam_license_terms:
+            license_terms_by_key.setdefault(RoamAlmaInterface.get_license_key(
+                license_term_object), []).append(license_term_object)
 
-                    # Add license links, if empty
-                    if license['license_details']['URI'] == "":
-                        license['license_details']["URI"] = license_term_object['license_details']["URI"]
+        for license in self.converted_roam_licenses:
+            logging.debug("Target Name: " + license["license_details"]["license_name"])
 
-                    # Also, set the license Status and Review Status equal to that of the license term,
-                    # as they're set dynamically by the term using the 'Active' column. I know this will
-                    # go through more than once, but it should do.
-                    license["license_details"]["license_status"] = license_term_object["license_details"]["license_status"]
-                    license["license_details"]["review_status"] = license_term_object["license_details"]["review_status"]
+            # Get the license terms with the same name AND start date, and add them to the license
+            for license_term_object in license_terms_by_key.get(RoamAlmaInterface.get_license_key(license), []):
+                self.__add_license_term_to_license(license, license_term_object)
+                license_terms_matched += RoamAlmaInterface.count_license_term_rows(
+                    [license_term_object])
 
         # Make sure all license terms were matched
         unmatched_license_terms = []
@@ -118,25 +218,232 @@ class RoamAlmaInterface():
             if "matched" in license_term_object:
                 if license_term_object["matched"] > 1:
                     # If it's matched more than once, add it to the appropriate array
-                    license_terms_matched_more_than_once.append(
-                        {"name": license_term_object["license_details"]["license_name"], "terms": license_term_object["term_list"]})
+                    license_terms_matched_more_than_once.append(license_term_object)
             else:
                 # If there's no matched variable, add it to the unmatched license terms
                 unmatched_license_terms.append(license_term_object)
 
+        RoamAlmaInterface.__log_join_results(
+            license_terms_matched, unmatched_license_terms, license_terms_matched_more_than_once)
+
+    def iter_merge_joined_licenses(self, licenses, license_terms):
+        """Combines licenses with their license terms by sorting both by (license name, start date) and merging them
+
+        The licenses are sorted in memory. The license terms are streamed through an external sort
+        (see bin.external_sort), which keeps at most Settings.join_max_rows_in_memory of them in memory and writes
+        the rest to disk in sorted runs, so the license terms can be an iterable that's never fully in memory.
+        Each license is yielded as soon as its group of license terms has been added to it, in the order of the
+        sorted keys. The licenses are combined in place, and the matched / unmatched accounting is the same as
+        the hash join's.
+
+        Input: Array of converted licenses, iterable of converted license terms
+        Output: Generator of the combined licenses"""
+        logging.info("Combining Roam Licenses and License Terms (sort-merge)...")
+        license_terms_matched = 0
+        unmatched_license_terms = []
+        license_terms_matched_more_than_once = []
+
+        sorted_licenses = sorted(licenses, key=RoamAlmaInterface.get_license_key)
+
+        # The license terms are numbered, so that the unmatched ones can be logged in their original order
+        sorted_license_terms = external_sort(
+            ((RoamAlmaInterface.get_license_key(license_term_object), position, license_term_object)
+             for position, license_term_object in enumerate(license_terms)),
+            key=itemgetter(0, 1),
+            max_items_in_memory=getattr(self.settings, "join_max_rows_in_memory", DEFAULT_MAX_ITEMS_IN_MEMORY))
+        license_term_groups = groupby(sorted_license_terms, key=itemgetter(0))
+        license_term_key, license_term_group = next(license_term_groups, (None, None))
+
+        for license_key, license_group in groupby(sorted_licenses, key=RoamAlmaInterface.get_license_key):
+            license_group = list(license_group)
+
+            # License terms with a smaller key than the license have no license
+            while license_term_group is not None and license_term_key < license_key:
+                unmatched_license_terms.extend(
+                    (position, license_term_object) for _, position, license_term_object in license_term_group)
+                license_term_key, license_term_group = next(license_term_groups, (None, None))
+
+            if license_term_group is not None and license_term_key == license_key:
+                license_term_group = list(license_term_group)
+                for license in license_group:
+                    logging.debug("Target Name: " + license["license_details"]["license_name"])
+                    for _, _, license_term_object in license_term_group:
+                        self.__add_license_term_to_license(license, license_term_object)
+                        license_terms_matched += RoamAlmaInterface.count_license_term_rows(
+                            [license_term_object])
+
+                # If there's more than one license with this key, its license terms were matched more than once
+                if len(license_group) > 1:
+                    license_terms_matched_more_than_once.extend(
+                        (position, license_term_object) for _, position, license_term_object in license_term_group)
+                license_term_key, license_term_group = next(license_term_groups, (None, None))
+
+            yield from license_group
+
+        # The remaining license terms have a larger key than every license
+        while license_term_group is not None:
+            unmatched_license_terms.extend(
+                (position, license_term_object) for _, position, license_term_object in license_term_group)
+            license_term_key, license_term_group = next(license_term_groups, (None, None))
+
+        RoamAlmaInterface.__log_join_results(
+            license_terms_matched,
+            [license_term_object for _, license_term_object in sorted(unmatched_license_terms, key=itemgetter(0))],
+            [license_term_object for _, license_term_object in sorted(license_terms_matched_more_than_once, key=itemgetter(0))])
+
+    @staticmethod
+    def count_license_term_rows(license_term_objects):
+        """Counts the ROAM license terms rows that license terms objects were converted from (a grouped object
+        from convert_roam_license_terms_grouped holds several)
+
+        Input: Array of converted license terms objects
+        Output: Number of rows"""
+        return sum(license_term_object.get("row_count", 1) for license_term_object in license_term_objects)
+
+    @staticmethod
+    def __log_join_results(license_terms_matched, unmatched_license_terms, license_terms_matched_more_than_once):
+        """Logs how many license terms were matched, and which weren't matched or were matched more than once
+
+        Input: Number of license terms rows matched, array of unmatched license terms objects, array of the license
+        terms objects matched more than once
+        Output: None"""
         logging.info("License Terms Matched: " + str(license_terms_matched))
         logging.info("Number of license terms unmatched: " +
-                     str(len(unmatched_license_terms)))
+                     str(RoamAlmaInterface.count_license_term_rows(unmatched_license_terms)))
         if len(unmatched_license_terms) > 0:
             logging.error("Unmatched License Terms: " +
                           json.dumps(unmatched_license_terms))
         logging.info("Number of license terms matched more than once: " + str(
-            len(license_terms_matched_more_than_once)))
+            RoamAlmaInterface.count_license_term_rows(license_terms_matched_more_than_once)))
         if len(license_terms_matched_more_than_once) > 0:
             logging.error("License Terms Matched More Than Once: " +
-                          json.dumps(license_terms_matched_more_than_once))
+                          json.dumps([{"name": license_term_object["license_details"]["license_name"], "terms": license_term_object["term_list"]}
+                                      for license_term_object in license_terms_matched_more_than_once]))
         logging.info("Done.\n\n")
 
+    @staticmethod
+    def get_license_key(converted_license):
+        """Returns the key licenses and license terms are matched on: their name and start date
+
+        Input: Converted license or license terms object
+        Output: (license name, start date) tuple"""
+        license_details = converted_license["license_details"]
+        return (license_details["license_name"], license_details["start_date"])
+
+    def __add_license_term_to_license(self, license, license_term_object):
+        """Adds the terms of a matching license terms object to a license, along with the license details the
+        license terms object sets
+
+        Input: Converted license, converted license terms object
+        Output: None (modifies the license, and counts the match on the license terms object)"""
+        # Set a variable that it's matched, for logging purposes, or increment it if its not there
+        if "matched" in license_term_object:
+            license_term_object["matched"] += 1
+        else:
+            license_term_object["matched"] = 1
+
+        for license_term in license_term_object["term_list"]:
+            license["term_list"].append(license_term)
+
+        # If the license notes are empty, add them
+        if len(license['note_list']) == 0:
+            license['note_list'] = license_term_object['note_list']
+
+        # Add license links, if empty
+        if license['license_details']['URI'] == "":
+            license['license_details']["URI"] = license_term_object['license_details']["URI"]
+
+        # Also, set the license Status and Review Status equal to that of the license term,
+        # as they're set dynamically by the term using the 'Active' column. I know this will
+        # go through more than once, but it should do.
+        license["license_details"]["license_status"] = license_term_object["license_details"]["license_status"]
+        license["license_details"]["review_status"] = license_term_object["license_details"]["review_status"]
+
+    @staticmethod
+    def get_license_columns(mappings):
+        """Returns the set of ROAM license file columns needed for the conversion
+
+        Input: Mappings class
+        Output: Set of column names"""
+        return set(RoamAlmaInterface.license_schema) | set(getattr(mappings, "additional_license_columns", []))
+
+    @staticmethod
+    def get_license_terms_columns(mappings):
+        """Returns the set of ROAM license terms file columns needed for the conversion
+
+        Input: Mappings class
+        Output: Set of column names"""
+        return set(RoamAlmaInterface.license_terms_schema) | set(getattr(mappings, "additional_license_terms_columns", []))
+
+    @staticmethod
+    def get_xsd_term_codes(xsd_file):
+        """Get the term codes enumerated for the term_code element of an XSD
+
+        Input: Filepath of XSD
+        Output: Set of term codes, or None if the XSD allows any term code"""
+        term_codes = None
+        for element in ET.parse(xsd_file).getroot().iter(XSD_NAMESPACE + "element"):
+            if element.get("name") == "term_code":
+                enumerations = list(element.iter(XSD_NAMESPACE + "enumeration"))
+                if enumerations:
+                    term_codes = (term_codes or set()) | {enumeration.get("value")
+                                                          for enumeration in enumerations}
+        return term_codes
+
+    @staticmethod
+    def compile_term_mappings(mappings, xsd_file):
+        """Compile Mappings.term_mappings and term_value_mappings into one flat lookup table, and check it
+
+        The table maps each normalized ROAM term name (see normalize_term_key) to a (main term code, notes term code,
+        value mapping) tuple, where the value mapping maps normalized Allowed values to Alma term values (None if
+        there's no main term code). Every term code is checked against the term codes enumerated in the XSD (if it
+        enumerates them), and every main term code must have a value mapping. All the problems found are raised
+        together in a TermMappingError.
+
+        Input: Mappings class, filepath of XSD
+        Output: Dict of normalized ROAM term name -> (main term code, notes term code, value mapping)"""
+        problems = []
+        term_codes = RoamAlmaInterface.get_xsd_term_codes(xsd_file)
+
+        value_mappings = {}
+        for term_code, value_mapping in mappings.term_value_mappings.items():
+            compiled_value_mapping = {}
+            for roam_value, alma_value in value_mapping.items():
+                key = normalize_term_key(roam_value)
+                if compiled_value_mapping.get(key, alma_value) != alma_value:
+                    problems.append("term_value_mappings['{}'] maps '{}' to different values".format(
+                        term_code, roam_value))
+                compiled_value_mapping[key] = alma_value
+            value_mappings[term_code] = compiled_value_mapping
+
+        term_plan = {}
+        for roam_term_name, codes in mappings.term_mappings.items():
+            if len(codes) != 2:
+                problems.append("term_mappings['{}'] should be [main term code, notes term code], not {!r}".format(
+                    roam_term_name, codes))
+                continue
+            main_term_code, notes_term_code = codes
+
+            for term_code in codes:
+                if term_code != "" and term_codes is not None and term_code not in term_codes:
+                    problems.append("term_mappings['{}'] uses term code '{}', which isn't in {}".format(
+                        roam_term_name, term_code, xsd_file))
+            if main_term_code != "" and main_term_code not in value_mappings:
+                problems.append("term_mappings['{}'] uses term code '{}', which isn't in term_value_mappings".format(
+                    roam_term_name, main_term_code))
+
+            plan_entry = (main_term_code, notes_term_code,
+                          value_mappings.get(main_term_code) if main_term_code != "" else None)
+            key = normalize_term_key(roam_term_name)
+            if term_plan.get(key, plan_entry) != plan_entry:
+                problems.append("term_mappings maps '{}' to different term codes".format(roam_term_name))
+            term_plan[key] = plan_entry
+
+        if problems:
+            raise TermMappingError(problems)
+
+        return term_plan
+
     @staticmethod
     def convert_objects_date_to_alma(object_array, property_names_array):
         """Converts certain properties in an object to the proper Alma format YYYMMDD
@@ -150,33 +457,103 @@ class RoamAlmaInterface():
 
         return converted_objects
 
+    @staticmethod
+    def convert_objects_date_columns_to_alma(object_array, property_names_array):
+        """Converts certain properties in an array of objects to the proper Alma format YYYYMMDD, a whole column at a time
+
+        Does the same as convert_objects_date_to_alma, but each property is converted for all the objects at once:
+        every distinct value of the column is parsed once, and the results are written back to all the rows that
+        have it. Dates that can't be parsed don't stop the conversion; they're all collected and raised together in
+        a DateConversionError once every column is done.
+
+        Input: Array of objects to convert, property names that you want to convert.
+        Output: Array of converted objects (the same objects, converted in place)."""
+        failures = []
+
+        for property in property_names_array:
+            column = [object_to_convert[property] for object_to_convert in object_array]
+
+            # A ROAM export repeats the same few dates on every row. The values are told apart by type as well, as
+            # True and 1 are equal, but only 1 is a date
+            converted_values = {}
+            for value_key in dict.fromkeys((type(value), value) for value in column):
+                try:
+                    converted_values[value_key] = convert_date_to_alma(value_key[1])
+                except (ValueError, TypeError):
+                    converted_values[value_key] = None
+
+            for row_index, value in enumerate(column):
+                converted_value = converted_values[(type(value), value)]
+                if converted_value is None:
+                    failures.append((row_index, property, value))
+                else:
+                    object_array[row_index][property] = converted_value
+
+        if failures:
+            raise DateConversionError(sorted(failures, key=lambda failure: failure[0]))
+
+        return object_array
+
+    @staticmethod
+    def iter_objects_date_converted_to_alma(objects, property_names_array):
+        """Converts certain properties of a stream of objects to the proper Alma format YYYYMMDD, one object at a time
+
+        The streaming version of convert_objects_date_columns_to_alma: each object is converted in place and yielded
+        as soon as it's done. Dates that can't be parsed don't stop the stream; they're all raised together in a
+        DateConversionError once the last object has been yielded.
+
+        Input: Iterable of objects to convert, property names that you want to convert.
+        Output: Generator of the converted objects."""
+        failures = []
+
+        for row_index, object_to_convert in enumerate(objects):
+            for property in property_names_array:
+                try:
+                    object_to_convert[property] = convert_date_to_alma(
+                        object_to_convert[property])
+                except (ValueError, TypeError):
+                    failures.append(
+                        (row_index, property, object_to_convert[property]))
+            yield object_to_convert
+
+        if failures:
+            raise DateConversionError(failures)
+
     @staticmethod
     def convert_object_date_to_alma(ind_object, property_names_array):
         """Converts certain properties in an individual object to the proper Alma format YYYYMMDD
 
         Input: Object, array of property names you want to convert
-        Output: Converted object"""
+        Output: Converted object. Raises a ValueError if a date can't be parsed."""
 
         for property in property_names_array:
-            # Convert it only if it's not empty
-            if ind_object[property] != "":
-
-                # If it's a datetime or timestamp, convert it with strftime
-                if isinstance(ind_object[property], datetime) or isinstance(ind_object[property], Timestamp):
-                    ind_object[property] = datetime.strftime(
-                        ind_object[property], "%Y%m%d")
-
-                # If it's a string, convert it with strptime and strftime. ONLY YYYY-MM-DD ACCEPTED
-                elif isinstance(ind_object[property], str):
-                    try:
-                        ind_object[property] = datetime.strftime(datetime.strptime(
-                            ind_object[property], "%m/%d/%Y"), "%Y%m%d")
-                    except ValueError:
-                        ind_object[property] = datetime.strftime(datetime.strptime(
-                            ind_object[property], "%Y-%m-%d"), "%Y%m%d")
+            # Dates are parsed by bin.date_parser; empty values are left empty
+            ind_object[property] = convert_date_to_alma(ind_object[property])
 
         return ind_object
 
+    def create_license_models(self):
+        """Replace the combined licenses with their License models (see bin/license_model.py), which hold the same in
+        far less memory. Equal terms and notes are shared between the licenses. Everything after the combine step
+        (creating the generateDS instances, and the export methods) takes either.
+
+        The converted license terms are only needed to combine the licenses, so they're released as well (their
+        terms and notes are in the models now). Note that this only lowers the memory held after the combine step:
+        the peak, while the licenses are being combined, is the same.
+
+        Input: None
+        Output: Array of License models (also sets internal instance variable)
+        """
+        logging.info("Creating license models...")
+        shared_objects = {}
+        # One at a time, so that the dicts of each license can be released as soon as it's replaced
+        for index, converted_license in enumerate(self.converted_roam_licenses):
+            self.converted_roam_licenses[index] = as_license_model(converted_license, shared_objects)
+        self.converted_roam_license_terms = None
+
+        logging.info("Done.\n\n")
+        return self.converted_roam_licenses
+
     def create_generateds_instances(self):
         """Generate generateDS instances from the combined license + license terms objects.
 
@@ -210,19 +587,8 @@ class RoamAlmaInterface():
             return -1
 
         for generateds_instance in self.generateds_instances:
-            # Generate the output file name using the specified prefix and suffix, as well as the license name (cleaned up to lower case and certain chars removed)
-            # , with an XML file extension
-            output_file = output_folder + "/" + \
-                str(counter) + "-" + prefix + re.sub("[.,!'() &$%#@*]", '', generateds_instance.get_license_details(
-                ).get_license_name().lower()) + suffix + ".xml"
-            with open(output_file, "w") as opened_output_file:
-                generateds_instance.export(
-                    opened_output_file, level=0, namespacedef_=self.namespace)
-                logging.debug("Wrote to " + output_file)
-
-            xmlschema.validate(output_file, self.settings.xsd_file)
-            logging.debug("Validation for " + output_file + " successful")
-
+            self.export_validate_generateds_instance(
+                generateds_instance, output_folder, counter, prefix, suffix)
             counter += 1
 
         logging.info("Exported {} out of {} generateDS instances".format(
@@ -230,6 +596,196 @@ class RoamAlmaInterface():
         logging.info("Done.\n\n")
         return 1
 
+    def export_validate_generateds_instance(self, generateds_instance, output_folder, counter, prefix="license-", suffix=""):
+        """Print out one license, in xml format, validate it against the XSD, and write it to the given output_folder
+
+        The file name starts with the counter (the position of the license), followed by the prefix, the license
+        name (cleaned up to lower case and certain chars removed) and the suffix.
+
+        Input: generateDS instance, output_folder, counter, prefix (optional), suffix (optional)
+        Output: Filepath of the XML file"""
+        output_file = self.get_output_file(
+            output_folder, counter, generateds_instance.get_license_details().get_license_name(), prefix, suffix)
+        xml_output = io.StringIO()
+        generateds_instance.export(
+            xml_output, level=0, namespacedef_=self.namespace, pretty_print=not self.compact_xml)
+
+        self.validate_write_xml(xml_output.getvalue(), output_file)
+        return output_file
+
+    def validate_write_xml(self, xml, output_file):
+        """Validate an XML document in memory against the XSD (compiled once, see bin/xml_validators.py) with
+        Settings.validation_backend, and write it to output_file if it's valid. Invalid documents aren't written.
+
+        Input: XML document (string, or UTF-8 bytes), filepath to write it to
+        Output: None (raises one of XML_VALIDATION_ERRORS if the document isn't valid)"""
+        try:
+            validate_xml(xml, self.settings.xsd_file, self.validation_backend)
+        except XML_VALIDATION_ERRORS:
+            logging.error("Validation for " + output_file + " failed, so it wasn't written")
+            raise
+        logging.debug("Validation for " + output_file + " successful")
+
+        with open(output_file, "wb" if isinstance(xml, bytes) else "w") as opened_output_file:
+            opened_output_file.write(xml)
+            logging.debug("Wrote to " + output_file)
+
+    @staticmethod
+    def get_output_file(output_folder, counter, license_name, prefix="license-", suffix=""):
+        """Get the filepath of the XML file of a license: the counter (the position of the license), followed by the
+        prefix, the license name (cleaned up to lower case and certain chars removed) and the suffix.
+
+        Input: output_folder, counter, license name, prefix (optional), suffix (optional)
+        Output: Filepath of the XML file"""
+        return output_folder + "/" + \
+            str(counter) + "-" + prefix + re.sub("[.,!'() &$%#@*]", '', license_name.lower()) + suffix + ".xml"
+
+    def export_validate_licenses(self, output_folder, prefix="license-", suffix=""):
+        """Print out all the combined licenses, in xml format, using Settings.xml_serializer, and validate them.
+
+        With the "generateds" serializer this does the same as create_generateds_instances followed by
+        export_validate_generateds_instances, except that each generateDS instance is dropped once it's written.
+
+        Input: output_folder, prefix (optional), suffix (optional)
+        Output: Number of licenses exported"""
+        logging.info("Exporting license XML files to " + output_folder)
+        os.makedirs(output_folder, exist_ok=True)
+
+        counter = 0
+        for converted_license in self.converted_roam_licenses:
+            self.export_validate_license(converted_license, output_folder, counter, prefix, suffix)
+            counter += 1
+
+        logging.info("Exported {} out of {} licenses".format(
+            counter, len(self.converted_roam_licenses)))
+        logging.info("Done.\n\n")
+        return counter
+
+    def export_validate_license(self, converted_license, output_folder, counter, prefix="license-", suffix=""):
+        """Print out one combined license, in xml format, using Settings.xml_serializer (see XML_SERIALIZERS), and
+        validate it against the XSD. The file is named as in export_validate_generateds_instance.
+
+        Input: Combined license (or its License model), output_folder, counter, prefix (optional), suffix (optional)
+        Output: Filepath of the XML file"""
+        license_model = as_license_model(converted_license)
+        if self.xml_serializer == "generateds":
+            generateds_instance = self.__create_generateds_instance(license_model)
+            return self.export_validate_generateds_instance(
+                generateds_instance, output_folder, counter, prefix, suffix)
+
+        output_file = self.get_output_file(
+            output_folder, counter, license_model.license_name, prefix, suffix)
+        self.validate_write_xml(self.serialize_license(license_model), output_file)
+        return output_file
+
+    def serialize_license(self, converted_license):
+        """Serialize one combined license to XML with Settings.xml_serializer, when it's "lxml" or "template"
+
+        Input: Combined license (or its License model)
+        Output: UTF-8 encoded XML (bytes)"""
+        if self.xml_serializer == "template":
+            return serialize_license_template(converted_license, self.compact_xml)
+        return serialize_license_lxml(converted_license, self.compact_xml)
+
+    def export_validate_licenses_parallel(self, output_folder, workers, prefix="license-", suffix="", shards_per_worker=4):
+        """Build, export and validate the combined licenses in a pool of worker processes
+
+        This does the same as export_validate_licenses. Each license is numbered with its position before the
+        licenses are split into shards (shards_per_worker per worker, so that the work stays balanced), so the
+        files are named exactly as in a serial run. Each worker builds, writes and validates the licenses of its
+        shards (see export_validate_license_shard). The Mappings and Settings classes are sent to the workers, so they
+        must be importable (as config_prod's are). Each worker sets up its RoamAlmaInterface (compiling the term
+        mappings against the XSD) once, when it starts (see init_export_worker), rather than once per shard.
+
+        Input: output_folder, number of worker processes, prefix (optional), suffix (optional),
+        shards_per_worker (optional)
+        Output: Number of licenses exported"""
+        logging.info("Building, exporting and validating license XML files in {} with {} workers".format(
+            output_folder, workers))
+        os.makedirs(output_folder, exist_ok=True)
+
+        numbered_licenses = list(enumerate(self.converted_roam_licenses))
+        shard_size = max(1, -(-len(numbered_licenses) // (workers * shards_per_worker)))
+        shards = [numbered_licenses[start:start + shard_size]
+                  for start in range(0, len(numbered_licenses), shard_size)]
+
+        counter = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=RoamAlmaInterface.init_export_worker,
+                                 initargs=(self.mappings, self.settings)) as executor:
+            export_validate_shard = partial(RoamAlmaInterface.export_validate_license_shard,
+                                            output_folder, prefix, suffix)
+            for output_files in executor.map(export_validate_shard, shards):
+                counter += len(output_files)
+
+        logging.info("Exported {} out of {} licenses".format(
+            counter, len(self.converted_roam_licenses)))
+        logging.info("Done.\n\n")
+        return counter
+
+    @staticmethod
+    def init_export_worker(mappings, settings):
+        """Set up a worker process of export_validate_licenses_parallel: create the RoamAlmaInterface its shards are
+        exported with
+
+        Input: Mappings class, Settings class
+        Output: None (sets the worker's interface)"""
+        global _export_worker_interface
+        _export_worker_interface = RoamAlmaInterface([], [], mappings, settings)
+
+    @staticmethod
+    def export_validate_license_shard(output_folder, prefix, suffix, numbered_licenses):
+        """Build, export and validate a shard of combined licenses. Run in the worker processes of
+        export_validate_licenses_parallel, once init_export_worker has set them up.
+
+        Input: output_folder, prefix, suffix, array of (counter, combined license) tuples
+        Output: Array of the filepaths of the XML files"""
+        output_files = []
+        for counter, converted_license in numbered_licenses:
+            output_files.append(_export_worker_interface.export_validate_license(
+                converted_license, output_folder, counter, prefix, suffix))
+
+        return output_files
+
+    def stream_export_validate_licenses(self, output_folder, prefix="license-", suffix=""):
+        """Convert, combine, build, export and validate the licenses one at a time, releasing each once it's written
+
+        This does the same as get_converted_license_term_objects, combine_roam_license_and_license_terms and
+        export_validate_licenses together, but the license terms
+        (self.roam_license_term_objects, which can be a generator) are converted one row at a time and combined
+        with the licenses by iter_merge_joined_licenses, so at most Settings.join_max_rows_in_memory of them are in
+        memory at once (the rest are sorted on disk). They're all read before the first license is written, as they
+        have to be sorted. Each combined license is then built, written and validated on its own, after which its
+        terms and notes are dropped. The licenses themselves (one row each) and the license terms without a license
+        (to be logged) are kept until the end.
+
+        The files are the same as export_validate_licenses writes: each one is numbered with the
+        position of its license in the license file, although they're written in license name order.
+
+        Input: output_folder, prefix (optional), suffix (optional)
+        Output: Number of licenses exported"""
+        logging.info("Streaming license XML files to " + output_folder)
+        os.makedirs(output_folder, exist_ok=True)
+
+        licenses = self.get_converted_license_objects()
+        license_positions = {id(license): position for position, license in enumerate(licenses)}
+
+        converted_license_terms = (self.__convert_roam_license_terms_object(roam_object)
+                                   for roam_object in self.roam_license_term_objects)
+
+        counter = 0
+        for license in self.iter_merge_joined_licenses(licenses, converted_license_terms):
+            self.export_validate_license(
+                license, output_folder, license_positions[id(license)], prefix, suffix)
+
+            # Release the terms and notes of the license, now that it's written
+            license["term_list"] = []
+            license["note_list"] = []
+            counter += 1
+
+        logging.info("Exported {} out of {} licenses".format(counter, len(licenses)))
+        logging.info("Done.\n\n")
+        return counter
+
     def convert_roam_license_terms_array(self, roam_objects):
         """Converts Roam objects parsed from XLSX to objects that can be passed to the license_class, which generates XML
         Input: ROAM XLSX parsed object[]
@@ -243,12 +799,71 @@ class RoamAlmaInterface():
 
         return converted_objects
 
+    def convert_roam_license_terms_grouped(self, roam_objects):
+        """Converts Roam license terms parsed from XLSX to one object per license, in a single pass
+
+        The rows are grouped by license name and start date (the key they're combined with their license on).
+        Each group becomes one license terms object holding everything the combine step uses: the terms of
+        every row (in order), the first non-empty notes and URI, and the license status and review status of
+        the last row. row_count holds the number of rows in the group, so that the combine step can count
+        them. Combining these gives the same licenses as combining the objects of
+        convert_roam_license_terms_array, without building a full license object for every row.
+
+        Input: ROAM XLSX parsed object[]
+        Output: Grouped license terms object[], in the order each license first appears"""
+        groups = {}
+
+        for roam_object in roam_objects:
+            license_key = (roam_object["License Name"], roam_object["Start Date"])
+            group = groups.get(license_key)
+            if group is None:
+                group = {
+                    "license_details": {
+                        "license_name": roam_object["License Name"],
+                        "start_date": roam_object["Start Date"],
+                        "URI": ""
+                    },
+                    "term_list": [],
+                    "note_list": [],
+                    "row_count": 0
+                }
+                groups[license_key] = group
+
+            group["row_count"] += 1
+            group["term_list"].extend(self.__convert_license_term_to_alma(
+                roam_object["Name"], roam_object["License Qualifiers"], roam_object["Allowed"], roam_object["Description"]))
+
+            # The notes and URI of the first row that has them are the ones the license gets
+            if len(group["note_list"]) == 0:
+                group["note_list"] = self.__convert_license_notes(
+                    roam_object["License Summary"], roam_object["License Notes"], roam_object["Publisher"])
+            if group["license_details"]["URI"] == "":
+                group["license_details"]["URI"] = roam_object["License Links"]
+
+            # The license gets the statuses of the last row
+            group["active"] = roam_object["Active"]
+
+        for group in groups.values():
+            active = group.pop("active")
+            group["license_details"]["license_status"] = self.mappings.convert_active_to_license_status(active)
+            group["license_details"]["review_status"] = self.mappings.convert_active_to_review_status(active)
+
+        return list(groups.values())
+
     def __convert_roam_license_array(self, roam_objects):
         """Converts Roam objects parsed from XLSX to objects that can be passed to the license_class, which generates XML
         Input: ROAM XLSX parsed object[]
         Output: Alma license_class-ready object[]"""
         converted_objects = []
 
+        if self.license_code_strategy == "registry":
+            # Give codes to all the new licenses at once, so that the registry file is only written once
+            roam_objects = list(roam_objects)
+            self.license_code_registry = LicenseCodeRegistry(
+                self.settings.license_code_registry, self.code_counter["prefix"])
+            self.license_code_registry.reserve_codes(
+                (roam_object["Name"], roam_object["Start Date"]) for roam_object in roam_objects)
+
         for roam_object in roam_objects:
             converted_object = self.__convert_roam_license_object(
                 roam_object)
@@ -256,40 +871,72 @@ class RoamAlmaInterface():
 
         return converted_objects
 
+    def __get_license_code(self, license_name, start_date):
+        """Get the license code of a license, using Settings.license_code_strategy (see LICENSE_CODE_STRATEGIES)
+
+        The "hash" and "registry" codes are made from the license name and start date, but Alma needs every license
+        code to be unique. So if several licenses have the same name and start date, the first one gets the code and
+        the others get it with a suffix of their position among them (ROAM-5, ROAM-5-2, ROAM-5-3, ...).
+
+        Input: License name, start date
+        Output: License code"""
+        if self.license_code_strategy == "counter":
+            license_code = self.code_counter["prefix"] + "-" + str(self.code_counter["counter"])
+            # Increment code counter
+            self.code_counter["counter"] += 1
+            return license_code
+
+        license_key = (str(license_name), str(start_date))
+        if self.license_code_strategy == "hash":
+            license_code = hash_license_code(self.code_counter["prefix"], license_name, start_date)
+            if self.license_code_keys.setdefault(license_code, license_key) != license_key:
+                raise ValueError("Licenses {!r} and {!r} have the same license code {}".format(
+                    self.license_code_keys[license_code], license_key, license_code))
+        else:
+            license_code = self.license_code_registry.get_code(license_name, start_date)
+
+        position = self.license_key_counts.get(license_key, 0) + 1
+        self.license_key_counts[license_key] = position
+        if position > 1:
+            license_code += "-" + str(position)
+            logging.warning("License '{}' starting {} is in the license file more than once. This one is given the "
+                            "license code {}".format(license_name, start_date, license_code))
+        return license_code
+
     def __create_generateds_instance(self, converted_license):
         """Generates a GenerateDS license class from a converted license (a license that's been converted to Alma JSON format)
 
-        Input: Alma JSON license
+        Input: Alma JSON license (or its License model)
         Output: GenerateDS license class"""
+        license_model = as_license_model(converted_license)
+
         # Create ds ownered entity
-        ds_ownered_entity = ownered_entity(
-            created_by=converted_license["license_details"]["ownered_entity"]["created_by"])
+        ds_ownered_entity = ownered_entity(created_by=license_model.created_by)
 
         # Create the ds notes + notes list component
         ds_notes = []
-        for json_note in converted_license["note_list"]:
+        for license_note in license_model.notes:
             ds_notes.append(
-                note(content=json_note["content"], ownered_entity=ds_ownered_entity))
+                note(content=license_note.content, ownered_entity=ds_ownered_entity))
         ds_note_list = note_list(note=ds_notes)
-        if len(ds_note_list.get_note()) != len(converted_license["note_list"]):
+        if len(ds_note_list.get_note()) != len(license_model.notes):
             logging.error(
-                converted_license["license_details"]["license_name"] + " - Not all notes added")
+                license_model.license_name + " - Not all notes added")
 
         # Create the ds license terms + license terms list component
         ds_terms = []
-        for json_term in converted_license["term_list"]:
+        for license_term in license_model.terms:
             ds_terms.append(
-                term(term_code=json_term["term_code"], term_value=json_term["term_value"]))
+                term(term_code=license_term.term_code, term_value=license_term.term_value))
         ds_term_list = term_list(term=ds_terms)
-        if len(ds_term_list.get_term()) != len(converted_license["term_list"]):
+        if len(ds_term_list.get_term()) != len(license_model.terms):
             logging.error(
-                converted_license["license_details"]["license_name"] + " - Not all terms added")
+                license_model.license_name + " - Not all terms added")
 
-        ds_license_details = license_details(license_code=converted_license["license_details"]["license_code"], type_=converted_license["license_details"]["type"],  license_name=converted_license["license_details"]["license_name"], license_status=converted_license[
-            "license_details"]["license_status"], start_date=converted_license["license_details"]["start_date"], review_status=converted_license["license_details"]["review_status"], URI=converted_license["license_details"]["URI"], ownered_entity=ds_ownered_entity)
-        if "end_date" in converted_license["license_details"]:
-            ds_license_details.set_end_date(
-                converted_license["license_details"]["end_date"])
+        ds_license_details = license_details(license_code=license_model.license_code, type_=license_model.type, license_name=license_model.license_name, license_status=license_model.license_status,
+                                             start_date=license_model.start_date, review_status=license_model.review_status, URI=license_model.URI, ownered_entity=ds_ownered_entity)
+        if license_model.end_date is not None:
+            ds_license_details.set_end_date(license_model.end_date)
 
         final_license_ds = license(ds_license_details, None, None)
         # Add terms and notes only if they exist
@@ -313,7 +960,7 @@ class RoamAlmaInterface():
                     "created_by": "USMAI ROAM License to Alma License Converter"
                 },
                 "license_name": roam_object["Name"],
-                "license_code": self.code_counter["prefix"] + "-" + str(self.code_counter["counter"]),
+                "license_code": self.__get_license_code(roam_object["Name"], roam_object["Start Date"]),
                 "license_status": "ACTIVE",
                 "review_status": "ACCEPTED",
                 "start_date": roam_object['Start Date'],
@@ -324,9 +971,6 @@ class RoamAlmaInterface():
             "note_list": [],
         }
 
-        # Increment code counter
-        self.code_counter["counter"] += 1
-
         # Add end date, if it exists
         if roam_object["End Date"] != "":
             alma_license_class_object["license_details"]["end_date"] = roam_object['End Date']
@@ -358,9 +1002,23 @@ class RoamAlmaInterface():
     def __convert_license_notes(self, license_summary, license_notes, publisher):
         """Convert license summary and license notes into Alma notes format
 
+        The notes are the same on every license terms row of a license, and those rows are next to each other in
+        a ROAM export. So the notes are only built once per license: when a row has the same notes as the one
+        before it, the same notes array is returned again. Don't modify it. Only the last notes are kept, so this
+        takes no extra memory however big the export is.
+
         Input: license_summary, license_notes
         Output: Notes JSON array, convertable to Alma
         """
+        # A new array is returned when there are no notes, as the combine step replaces empty note arrays anyway
+        if license_summary == "" and license_notes == "" and publisher == "":
+            return []
+
+        last_note_list = self.last_note_list
+        if last_note_list is not None and last_note_list[0] == license_summary and \
+                last_note_list[1] == license_notes and last_note_list[2] == publisher:
+            return last_note_list[3]
+
         notes = []
 
         if license_summary != "":
@@ -376,6 +1034,7 @@ class RoamAlmaInterface():
                 "content": "Publisher: " + publisher
             })
 
+        self.last_note_list = (license_summary, license_notes, publisher, notes)
         return notes
 
     def __convert_license_term_to_alma(self, roam_term_name, roam_term_qualifier, roam_term_allowed, roam_term_description):
@@ -385,19 +1044,24 @@ class RoamAlmaInterface():
         Output: Roam term JSON array, convertable to Alma.
         """
         # Get the mapping of the ROAM license term name to the Alma License Term Names
-        mapping = self.term_mapping[roam_term_name]
-
-        main_license_term_code_name = mapping[0]
-        notes_license_term_code_name = mapping[1]
+        plan_entry = self.term_plan.get(normalize_term_key(roam_term_name))
+        if plan_entry is None:
+            raise TermMappingError(
+                ["ROAM term '{}' isn't in Mappings.term_mappings".format(roam_term_name)])
+        main_license_term_code_name, notes_license_term_code_name, value_mapping = plan_entry
 
         # The array of terms to return
         term_array = []
 
         # If there's a main license term, get the terms
         if main_license_term_code_name != "":
+            term_value = value_mapping.get(normalize_term_key(roam_term_allowed))
+            if term_value is None:
+                raise TermMappingError(["Allowed value '{}' of ROAM term '{}' isn't in Mappings.term_value_mappings['{}']".format(
+                    roam_term_allowed, roam_term_name, main_license_term_code_name)])
             main_license_term = {
                 "term_code": main_license_term_code_name,
-                "term_value": self.term_value_mapping[main_license_term_code_name][roam_term_allowed]
+                "term_value": term_value
             }
             term_array.append(main_license_term)
 
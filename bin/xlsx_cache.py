@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import os
+import pickle
+
+from bin.xlsx_to_objects import convert_xlsx_to_objects
+
+# Bump this whenever the output of convert_xlsx_to_objects changes, so that old cache entries are ignored
+CACHE_VERSION = 1
+CACHE_EXTENSION = ".pickle"
+
+
+def convert_xlsx_to_objects_cached(filepath, columns=None, schema=None, cache_folder="cache", max_cache_size=200 * 1024 * 1024):
+    """
+    This method converts an XLSX file to a list of python objects, like convert_xlsx_to_objects, but keeps
+    the parsed rows in an on-disk cache so that unchanged files don't have to be parsed again.
+
+    Cache entries are keyed by a hash of the file contents and the reader options. When a file changes, its
+    old entry for the same reader options is removed (entries for other columns or schemas are kept); unreadable entries are removed and re-parsed; and the least recently used entries
+    are removed when the cache folder gets bigger than max_cache_size (in bytes).
+
+    Input: Filepath of XLSX, columns (optional), schema (optional), cache_folder (optional), max_cache_size (optional)
+    Output: Array of Python Objects representing XLSX rows
+    """
+    cache_key = get_cache_key(filepath, columns, schema)
+    # Entries for the same input file read with the same options share a prefix, so that stale versions of it
+    # can be found
+    entry_prefix = hashlib.sha256((os.path.abspath(filepath) + "\x1f" + _get_reader_options(columns, schema))
+                                  .encode("utf-8")).hexdigest()[:16] + "-"
+    entry_path = os.path.join(
+        cache_folder, entry_prefix + cache_key + CACHE_EXTENSION)
+
+    objects = _load_cache_entry(entry_path, cache_key)
+    if objects is not None:
+        logging.debug("Loaded " + filepath + " from cache " + entry_path)
+        return objects
+
+    logging.debug("No cache entry for " + filepath + ", parsing it...")
+    objects = convert_xlsx_to_objects(filepath, columns, schema)
+
+    try:
+        os.makedirs(cache_folder, exist_ok=True)
+        _remove_stale_entries(cache_folder, entry_prefix, entry_path)
+        _write_cache_entry(entry_path, cache_key, objects)
+        _enforce_cache_size(cache_folder, max_cache_size)
+    except OSError as e:
+        # The cache is only an optimization, so don't fail the run if it can't be written
+        logging.warning("Could not write cache entry for " +
+                        filepath + ": " + e.__str__())
+
+    return objects
+
+
+def get_cache_key(filepath, columns=None, schema=None):
+    """
+    Get the cache key for a file: a hash of its contents, the reader options, and the cache version
+
+    Input: Filepath, columns (optional), schema (optional)
+    Output: Hex digest string
+    """
+    file_hash = hashlib.sha256()
+    with open(filepath, "rb") as opened_file:
+        for chunk in iter(lambda: opened_file.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+
+    file_hash.update(_get_reader_options(columns, schema).encode("utf-8"))
+
+    return file_hash.hexdigest()
+
+
+def _get_reader_options(columns=None, schema=None):
+    """
+    Get the reader options (and the cache version) as a string, for the cache keys
+
+    Input: columns (optional), schema (optional)
+    Output: String
+    """
+    return repr((CACHE_VERSION,
+                 sorted(columns) if columns is not None else None,
+                 sorted(schema.items()) if schema is not None else None))
+
+
+def _load_cache_entry(entry_path, cache_key):
+    """
+    Load the rows from a cache entry. Corrupt entries are removed.
+
+    Input: Path of the cache entry, expected cache key
+    Output: Array of Python Objects, or None if there's no usable entry
+    """
+    if not os.path.isfile(entry_path):
+        return None
+
+    try:
+        with open(entry_path, "rb") as entry_file:
+            entry = pickle.load(entry_file)
+        if entry["version"] != CACHE_VERSION or entry["key"] != cache_key:
+            raise ValueError("cache entry doesn't match its key")
+    except Exception as e:
+        logging.warning("Removing corrupt cache entry " +
+                        entry_path + ": " + e.__str__())
+        _remove_file(entry_path)
+        return None
+
+    # Mark the entry as recently used
+    os.utime(entry_path)
+    return entry["rows"]
+
+
+def _write_cache_entry(entry_path, cache_key, objects):
+    """
+    Write the rows to a cache entry. The entry is written to a temporary file first, so that
+    an interrupted run never leaves a half-written entry behind.
+
+    Input: Path of the cache entry, cache key, array of Python Objects
+    Output: None
+    """
+    temporary_path = entry_path + ".tmp"
+    with open(temporary_path, "wb") as entry_file:
+        pickle.dump({"version": CACHE_VERSION, "key": cache_key, "rows": objects},
+                    entry_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, entry_path)
+
+
+def _remove_stale_entries(cache_folder, entry_prefix, entry_path):
+    """
+    Remove the cache entries of older versions of an input file
+
+    Input: Cache folder, prefix of the file's entries, path of the current entry
+    Output: None
+    """
+    for filename in os.listdir(cache_folder):
+        path = os.path.join(cache_folder, filename)
+        if filename.startswith(entry_prefix) and path != entry_path:
+            logging.debug("Removing stale cache entry " + path)
+            _remove_file(path)
+
+
+def _enforce_cache_size(cache_folder, max_cache_size):
+    """
+    Remove the least recently used cache entries until the cache folder is no bigger than max_cache_size
+
+    Input: Cache folder, maximum size in bytes
+    Output: None
+    """
+    entries = []
+    for filename in os.listdir(cache_folder):
+        if filename.endswith(CACHE_EXTENSION):
+            entry_stat = os.stat(os.path.join(cache_folder, filename))
+            entries.append((entry_stat.st_mtime, entry_stat.st_size,
+                           os.path.join(cache_folder, filename)))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_cache_size:
+            break
+        logging.debug("Cache is full, removing " + path)
+        _remove_file(path)
+        total_size -= size
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
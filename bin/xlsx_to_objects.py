@@ -1,54 +1,252 @@
-import pandas as pd
 import unicodedata
-from bs4 import BeautifulSoup
-import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from openpyxl import load_workbook
 
+from bin.html_strippers import DEFAULT_HTML_BACKEND, get_html_stripper
+from bin.roam_schema import get_converters
 
-def clean_json(json_objects, remove_newline=False):
+# The number of distinct cleaned values kept in the cleaning cache
+CLEAN_CACHE_SIZE = 4096
+
+# The number of objects each cleaning process gets at a time (Settings.clean_chunk_size)
+DEFAULT_CLEAN_CHUNK_SIZE = 2000
+
+
+def clean_json(json_objects, remove_newline=False, workers=1, chunk_size=DEFAULT_CLEAN_CHUNK_SIZE,
+               html_backend=DEFAULT_HTML_BACKEND):
     """
     This method removes HTML tags, compatibility characters, and (optionally) newlines from a JSON object
 
-    Input: json objects to be cleaned, remove_newlines (boolean)
+    Only the string values are cleaned; each one is cleaned on its own, so the objects are never turned into
+    one big string. Other values (numbers, booleans, dates) are returned as they are.
+
+    If workers is more than 1 and json_objects is a list longer than chunk_size, the list is split into
+    chunks of chunk_size objects which are cleaned in a pool of worker processes. The order of the objects
+    is kept. Smaller lists are cleaned in this process, as starting the pool would take longer than it saves.
+    Note that each worker has its own cleaned value cache, so clean_cache_info doesn't count their hits.
+
+    Input: json objects to be cleaned (a list, a dict, or a single value), remove_newlines (boolean),
+    workers (optional, number of processes), chunk_size (optional, number of objects per chunk),
+    html_backend (optional, see bin.html_strippers)
     Output: Cleaned JSON
     """
-    # Convert json object array to a string with ensure_ascii = false. If ensure_ascii is true,
-    # it will convert certain spaces to compatibility characters ('/xa0', etc) which are hard to
-    # remove
-    stringified_json = json.dumps(json_objects, ensure_ascii=False)
+    # Check the backend before anything is cleaned, rather than when the first value with HTML is found
+    get_html_stripper(html_backend)
 
-    # Remove HTML Tags
-    stringified_cleaned_json = BeautifulSoup(
-        stringified_json, 'html.parser').get_text()
+    if workers > 1 and isinstance(json_objects, list) and len(json_objects) > chunk_size:
+        return _clean_json_parallel(json_objects, remove_newline, workers, chunk_size, html_backend)
 
-    # Remove compatibility characters
-    stringified_normalized_json = unicodedata.normalize(
-        "NFKD", stringified_cleaned_json)
+    return _clean_json(json_objects, remove_newline, html_backend)
+
+
+def _clean_json(json_objects, remove_newline, html_backend):
+    """
+    Clean JSON in this process (see clean_json)
+
+    Input: json objects to be cleaned, remove_newlines (boolean), HTML backend
+    Output: Cleaned JSON
+    """
+    if isinstance(json_objects, str):
+        return clean_string(json_objects, remove_newline, html_backend)
+    if isinstance(json_objects, dict):
+        return {key: _clean_json(value, remove_newline, html_backend) for key, value in json_objects.items()}
+    if isinstance(json_objects, (list, tuple)):
+        return [_clean_json(value, remove_newline, html_backend) for value in json_objects]
+
+    return json_objects
+
+
+def _clean_json_parallel(json_objects, remove_newline, workers, chunk_size, html_backend):
+    """
+    Clean a list of JSON objects in chunks, using a pool of worker processes
+
+    Input: List of json objects, remove_newlines (boolean), number of processes, number of objects per chunk,
+    HTML backend
+    Output: List of cleaned json objects, in the same order
+    """
+    chunks = [json_objects[start:start + chunk_size]
+              for start in range(0, len(json_objects), chunk_size)]
+
+    cleaned_json = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map returns the results in the order of the chunks
+        clean_chunk = partial(clean_json, remove_newline=remove_newline,
+                              html_backend=html_backend)
+        for cleaned_chunk in executor.map(clean_chunk, chunks):
+            cleaned_json.extend(cleaned_chunk)
+
+    return cleaned_json
+
+
+def clean_string(value, remove_newline=False, html_backend=DEFAULT_HTML_BACKEND):
+    """
+    This method removes HTML tags, compatibility characters, and (optionally) newlines from a string
+
+    Strings that can't contain HTML or compatibility characters (no '<' or '&', and ASCII only) skip
+    straight to the newline removal. The others are cleaned through an LRU cache, as the same long values
+    (e.g., license notes) are repeated on every license term row; see clean_cache_info.
+
+    Input: String to be cleaned, remove_newlines (boolean), html_backend (optional, see bin.html_strippers)
+    Output: Cleaned string
+    """
+    if "<" in value or "&" in value or not value.isascii():
+        return _clean_markup(value, remove_newline == True, html_backend)
 
     # Remove line breaks, if users want it
     if remove_newline == True:
-        stringified_normalized_json = stringified_normalized_json.replace(
-            "\\n", " ")
+        value = value.replace("\n", " ")
 
-    # Convert the string back to JSON
-    cleaned_json = json.loads(stringified_normalized_json)
+    return value
+
+
+def clean_cache_info():
+    """
+    Returns the hits, misses, maximum size and current size of the cleaned value cache
+
+    Input: None
+    Output: functools cache info named tuple
+    """
+    return _clean_markup.cache_info()
 
-    # Returned the cleaned JSON
-    return cleaned_json
 
+def clear_clean_cache():
+    """
+    Empties the cleaned value cache and resets its counters
 
-def convert_xlsx_to_objects(filepath):
+    Input: None
+    Output: None
+    """
+    _clean_markup.cache_clear()
+
+
+@lru_cache(maxsize=CLEAN_CACHE_SIZE)
+def _clean_markup(value, remove_newline, html_backend):
+    """
+    Clean a string that may contain HTML or compatibility characters. Results are cached by value,
+    remove_newline and HTML backend.
+
+    Input: String to be cleaned, remove_newlines (boolean), HTML backend
+    Output: Cleaned string
+    """
+    # Remove HTML Tags (and decode HTML entities)
+    if "<" in value or "&" in value:
+        value = get_html_stripper(html_backend)(value)
+
+    # Remove compatibility characters
+    if not value.isascii() and not unicodedata.is_normalized("NFKD", value):
+        value = unicodedata.normalize("NFKD", value)
+
+    # Remove line breaks, if users want it
+    if remove_newline:
+        value = value.replace("\n", " ")
+
+    return value
+
+
+def convert_xlsx_to_objects(filepath, columns=None, schema=None):
     """
     This method converts an XLSX file to a list of python objects.
 
-    Input: Filepath of XLSX
+    Input: Filepath of XLSX, columns (optional, only these columns are parsed), schema (optional, column types)
     Output: Array of Python Objects representing XLSX rows
     """
+    return list(iter_xlsx_rows(filepath, columns, schema))
+
+
+def iter_xlsx_rows(filepath, columns=None, schema=None):
+    """
+    This method streams the rows of an XLSX file as python objects, one row at a time.
+
+    The workbook is opened in read-only mode, so only the current row is held in memory no matter how
+    large the sheet is. Rows have the same keys and values that pd.read_excel(keep_default_na=False)
+    used to produce: blank cells are empty strings, whole-number floats are ints, and trailing empty
+    rows are skipped.
+
+    If columns is given, only those columns are converted and included in the row objects; the
+    others are skipped. Required columns that the sheet doesn't have are left out as well.
+
+    If schema is given, the columns in it are converted to their declared type (see bin.roam_schema)
+    instead of keeping the type Excel stored them with.
+
+    Input: Filepath of XLSX, columns (optional, collection of column names to keep), schema (optional,
+    dict of column name -> column type)
+    Output: Generator of Python Objects representing XLSX rows
+    """
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+        column_names = _get_column_names(header_row)
+
+        # Get the positions and converter functions of the columns to keep
+        converters = get_converters(schema)
+        selected_columns = [(index, name, converters.get(name, _convert_cell))
+                            for index, name in enumerate(column_names)
+                            if columns is None or name in columns]
+        selected_names = [name for _, name, _ in selected_columns]
+        width = len(column_names)
 
-    objects = []
+        # Empty rows are held back until a non-empty row follows them, so that trailing empty rows
+        # (which Excel often leaves behind) are dropped while empty rows in the middle of the sheet are kept.
+        # Emptiness is checked over the whole row, so that the row count doesn't depend on the columns kept.
+        pending_empty_rows = 0
+        for row in rows:
+            if all(value is None or value == "" for value in row[:width]):
+                pending_empty_rows += 1
+                continue
 
-    # Read the excel file, and disable nan values (we want empty string instead)
-    df = pd.read_excel(filepath, keep_default_na=False)
+            for _ in range(pending_empty_rows):
+                yield {name: convert(None) for _, name, convert in selected_columns}
+            pending_empty_rows = 0
+
+            # Short rows are padded (read-only worksheets don't return the cells after the last filled one)
+            yield {name: convert(row[index] if index < len(row) else None)
+                   for index, name, convert in selected_columns}
+    finally:
+        workbook.close()
+
+
+def _get_column_names(header_row):
+    """
+    Get the column names from the header row, naming them the same way pandas does.
 
-    objects = df.to_dict(orient="records")
+    Trailing empty header cells are dropped, other empty ones become 'Unnamed: <index>', and repeated
+    names get a '.<count>' suffix.
 
-    return objects
\ No newline at end of file
+    Input: Header row values
+    Output: Array of column names
+    """
+    header_values = list(header_row)
+    while header_values and header_values[-1] is None:
+        header_values.pop()
+
+    column_names = []
+    seen_names = {}
+    for index, value in enumerate(header_values):
+        name = "Unnamed: " + str(index) if value is None else _convert_cell(value)
+        if name in seen_names:
+            seen_names[name] += 1
+            name = str(name) + "." + str(seen_names[name])
+        else:
+            seen_names[name] = 0
+        column_names.append(name)
+
+    return column_names
+
+
+def _convert_cell(value):
+    """
+    Convert a raw openpyxl cell value to the value pandas would have given it.
+
+    Input: Cell value
+    Output: Converted value (empty string for blank cells, int for whole-number floats)
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
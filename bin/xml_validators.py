@@ -0,0 +1,58 @@
+from functools import lru_cache
+from xml.etree.ElementTree import ParseError
+
+import xmlschema
+from lxml import etree
+
+# Libraries the XML files can be validated against the XSD with (Settings.validation_backend)
+#
+# xmlschema - the xmlschema package, in pure Python. The original behaviour, with its detailed error messages.
+# lxml - libxml2's XML Schema validator, through lxml. Many times faster, with shorter error messages.
+#
+# Run benchmarks/benchmark_validation_backends.py to compare them on your own output.
+VALIDATION_BACKENDS = ("xmlschema", "lxml")
+DEFAULT_VALIDATION_BACKEND = "xmlschema"
+
+# The errors raised by validate_xml for invalid documents, with either backend: documents that don't match the XSD,
+# and documents that aren't well-formed XML
+XML_VALIDATION_ERRORS = (xmlschema.XMLSchemaValidationError, etree.DocumentInvalid, ParseError, etree.XMLSyntaxError)
+
+
+@lru_cache(maxsize=None)
+def get_xml_schema(xsd_file):
+    """
+    Compile an XSD with xmlschema. Each XSD is only compiled once per process (so once per worker, with several
+    workers).
+
+    Input: Filepath of XSD
+    Output: xmlschema.XMLSchema
+    """
+    return xmlschema.XMLSchema(xsd_file)
+
+
+@lru_cache(maxsize=None)
+def get_lxml_schema(xsd_file):
+    """
+    Compile an XSD with lxml. Each XSD is only compiled once per process.
+
+    Input: Filepath of XSD
+    Output: lxml.etree.XMLSchema
+    """
+    return etree.XMLSchema(etree.parse(xsd_file))
+
+
+def validate_xml(xml, xsd_file, validation_backend=DEFAULT_VALIDATION_BACKEND):
+    """
+    Validate an XML document in memory against an XSD
+
+    Input: XML document (string or UTF-8 bytes), filepath of XSD, validation_backend (optional, see
+    VALIDATION_BACKENDS)
+    Output: None (raises one of XML_VALIDATION_ERRORS if the document isn't valid)
+    """
+    if validation_backend == "lxml":
+        get_lxml_schema(xsd_file).assertValid(etree.fromstring(xml))
+    elif validation_backend == "xmlschema":
+        get_xml_schema(xsd_file).validate(xml)
+    else:
+        raise ValueError("Unknown validation backend '" + str(validation_backend) + "'. Choose one of: " +
+                         ", ".join(VALIDATION_BACKENDS))
@@ -1,17 +1,62 @@
 import logging
 
+from bin.xlsx_to_objects import DEFAULT_CLEAN_CHUNK_SIZE
+
 
 class Settings:
     # Clean all data parsed from excel, removing HTML data and Unicode compatibility characters (/xa0, etc)
     clean = True
     # Remove newlines only works if clean=True
     remove_newline = True
+    # Library used to remove HTML while cleaning: "beautifulsoup" (the original), "htmlparser" (faster, nearly always
+    # the same output) or "lxml" (fastest, differs on malformed HTML). See bin/html_strippers.py.
+    html_backend = "beautifulsoup"
+    # Number of processes used to clean the data. Use 1 to clean everything in the main process.
+    clean_workers = 1
+    # Number of rows each cleaning process gets at a time. Files with fewer rows than this are always
+    # cleaned in the main process, as starting the processes would take longer than it saves. The default is 2000.
+    clean_chunk_size = DEFAULT_CLEAN_CHUNK_SIZE
+    # Number of processes that build, write and validate the XML files (can also be set with commandline). Use 1 to do
+    # it all in the main process. Not used with stream_pipeline.
+    export_workers = 1
+    # How the XML files are written: "generateds" (the generateDS classes in bin/license_class.py), "lxml" (straight
+    # from the combined licenses with lxml) or "template" (from string templates; fastest). All write the same XML.
+    # See bin/license_serializers.py.
+    xml_serializer = "generateds"
+    # Write the XML files on one line, without indentation. Smaller files, but harder to read.
+    compact_xml = False
+    # Library the XML files are validated against the XSD with: "xmlschema" (detailed error messages) or "lxml" (many
+    # times faster). See bin/xml_validators.py.
+    validation_backend = "xmlschema"
     # License XSD file
     xsd_file = "config/erm_license_edited.xsd"
     # License input file (can also be set with commandline)
     license_input = "input/licenses.xlsx"
     # License terms input file (can also be set with commandline)
     license_terms_input = "input/license_terms.xlsx"
+    # Cache the parsed input files, so that re-running on unchanged files skips the XLSX parsing
+    cache_input = True
+    # Folder the parsed input files are cached in
+    cache_folder = "cache"
+    # Maximum size of the cache folder, in bytes. The least recently used entries are removed first.
+    cache_max_size = 200 * 1024 * 1024
+    # How licenses are matched with their license terms: "hash" (fastest, keeps all the license terms in memory)
+    # or "sort_merge" (sorts the license terms on disk once there are too many to keep in memory)
+    join_strategy = "hash"
+    # Maximum number of license terms the "sort_merge" join keeps in memory at a time
+    join_max_rows_in_memory = 100000
+    # Convert the license terms rows straight into one object per license, instead of a full license object per row.
+    # Faster and gives the same output, but changes made to __convert_roam_license_terms_object aren't used.
+    group_license_terms = False
+    # Stream the license terms through the conversion one row at a time, writing each license as soon as its terms are
+    # combined, instead of holding every stage in memory. Uses the "sort_merge" join, and clean_workers isn't used.
+    stream_pipeline = False
+    # How licenses get their Alma license codes: "counter" (ROAM-0, ROAM-1, ... in the order of the license file),
+    # "hash" (a hash of the license name and start date) or "registry" (numbered, and each license keeps its code
+    # in later runs). Use "hash" or "registry" if you re-import licenses into Alma. See bin/license_codes.py.
+    license_code_strategy = "counter"
+    # File the "registry" license code strategy keeps the codes in. Keep it between runs!
+    license_code_registry = "license_codes.json"
     # Logging file
     logging_file = "logs/systemlogs.log"
     # Logging level
@@ -71,6 +116,11 @@ class Mappings:
         "USE-STAT": {"yes": "YES", "no": "NO", "n/a": "SILENT"}
     }
 
+    # Only the columns used by the converter are read from the ROAM files. If your custom transformation functions
+    # (see below) use any other ROAM columns, list them here so that they get parsed too.
+    additional_license_columns = []
+    additional_license_terms_columns = []
+
     # Define your custom transformation functions here, you can then add them to RoamAlmaInterface.__convert_roam_license_object and/or __convert_roam_license_term_object
     # Just include them in the alma_license_class_object property that you want to set dynamically.
     # ----------------------------------------------------------------------------------------------
@@ -2,12 +2,119 @@ import argparse
 import logging
 import os
 
-from bin.xlsx_to_objects import clean_json
-from bin.roam_to_alma_interface import RoamAlmaInterface
-from bin.xlsx_to_objects import convert_xlsx_to_objects
+from bin.csv_to_objects import convert_csv_to_objects, iter_csv_rows
+from bin.html_strippers import get_html_stripper
+from bin.preflight import LICENSE_KEY_COLUMNS, LICENSE_TERMS_KEY_COLUMNS, find_input_problems, get_key_schema
+from bin.xlsx_to_objects import clean_cache_info, clean_json
+from bin.roam_to_alma_interface import DateConversionError, RoamAlmaInterface, TermMappingError
+from bin.xlsx_to_objects import convert_xlsx_to_objects, iter_xlsx_rows
+from bin.xlsx_cache import convert_xlsx_to_objects_cached
 from config.config_prod import Mappings, Settings
 
 
+def load_roam_objects(filepath, columns, schema):
+    """Parse the rows of a ROAM XLSX or CSV file. XLSX files go through the parsed-input cache if it's turned on
+
+    Input: Filepath of XLSX or CSV, columns to parse, schema of the column types
+    Output: Array of Python Objects representing the file rows"""
+    if filepath.lower().endswith(".csv"):
+        return convert_csv_to_objects(filepath, columns, schema)
+    if Settings.cache_input:
+        return convert_xlsx_to_objects_cached(filepath, columns, schema,
+                                              cache_folder=Settings.cache_folder, max_cache_size=Settings.cache_max_size)
+    return convert_xlsx_to_objects(filepath, columns, schema)
+
+
+def iter_roam_objects(filepath, columns, schema):
+    """Stream the rows of a ROAM XLSX or CSV file, one row at a time (the parsed-input cache isn't used)
+
+    Input: Filepath of XLSX or CSV, columns to parse, schema of the column types
+    Output: Generator of Python Objects representing the file rows"""
+    if filepath.lower().endswith(".csv"):
+        return iter_csv_rows(filepath, columns, schema)
+    return iter_xlsx_rows(filepath, columns, schema)
+
+
+def log_date_conversion_error(e):
+    """Log every date a DateConversionError holds, so they can all be fixed before the next run
+
+    Input: DateConversionError
+    Output: None"""
+    for row_index, property, value in e.failures:
+        logging.error("Could not convert {} of row {} to Alma format: {!r}".format(
+            property, row_index + 2, value))
+    logging.error("Conversion stopped, please fix the dates above.")
+
+
+def stream_pipeline(license_input, license_terms_input, output_folder):
+    """Run the conversion as a stream: each license terms row is parsed, date-fixed, cleaned and converted on its
+    own, and each license is built, written and validated as soon as its license terms are combined with it
+
+    Only the licenses (one row each) are read into memory up front. See
+    RoamAlmaInterface.stream_export_validate_licenses.
+
+    Input: Filepaths of the license and license terms files, output folder
+    Output: Number of licenses exported"""
+    logging.info("Parsing licenses...")
+    roam_license_objects = load_roam_objects(
+        license_input, RoamAlmaInterface.get_license_columns(Mappings), RoamAlmaInterface.license_schema)
+    RoamAlmaInterface.convert_objects_date_columns_to_alma(
+        roam_license_objects, ["Start Date", "End Date"])
+    if Settings.clean:
+        roam_license_objects = clean_json(
+            roam_license_objects, remove_newline=Settings.remove_newline, html_backend=Settings.html_backend)
+    logging.info("Done.\n\n")
+
+    # Nothing is read from the license terms file until the licenses are combined with them
+    roam_license_term_objects = RoamAlmaInterface.iter_objects_date_converted_to_alma(
+        iter_roam_objects(license_terms_input, RoamAlmaInterface.get_license_terms_columns(Mappings),
+                          RoamAlmaInterface.license_terms_schema),
+        ["Start Date", "End Date"])
+    if Settings.clean:
+        roam_license_term_objects = (
+            clean_json(roam_object, remove_newline=Settings.remove_newline, html_backend=Settings.html_backend)
+            for roam_object in roam_license_term_objects)
+
+    roam_alma_interface = RoamAlmaInterface(
+        roam_license_objects, roam_license_term_objects, Mappings, Settings)
+    return roam_alma_interface.stream_export_validate_licenses(output_folder)
+
+
+def preflight(license_input, license_terms_input):
+    """Check the key columns of the ROAM files for problems, and log them all in one report
+
+    Nothing is converted or written; see bin.preflight for the checks.
+
+    Input: Filepaths of the license and license terms files
+    Output: Number of problems found"""
+    roam_license_objects = load_roam_objects(
+        license_input, LICENSE_KEY_COLUMNS, get_key_schema(RoamAlmaInterface.license_schema, LICENSE_KEY_COLUMNS))
+    roam_license_term_objects = load_roam_objects(
+        license_terms_input, LICENSE_TERMS_KEY_COLUMNS,
+        get_key_schema(RoamAlmaInterface.license_terms_schema, LICENSE_TERMS_KEY_COLUMNS))
+
+    # The names are matched after cleaning in a full run, so they're cleaned here as well
+    if Settings.clean:
+        roam_license_objects = clean_json(
+            roam_license_objects, remove_newline=Settings.remove_newline, html_backend=Settings.html_backend)
+        roam_license_term_objects = clean_json(
+            roam_license_term_objects, remove_newline=Settings.remove_newline, html_backend=Settings.html_backend)
+
+    problems = find_input_problems(
+        roam_license_objects, roam_license_term_objects, Mappings, Settings.xsd_file)
+
+    for problem in problems:
+        logging.error(problem)
+    summary = "Pre-flight check of {} licenses and {} license terms: {} problem(s) found".format(
+        len(roam_license_objects), len(roam_license_term_objects), len(problems))
+    logging.info(summary)
+
+    # The problems are only in the log, but say where to find them, as this is run by hand
+    print(summary + (", see " + Settings.logging_file if problems else ""))
+
+    return len(problems)
+
+
 def main():
     os.makedirs(name=os.path.dirname(Settings.logging_file), exist_ok=True)
     # Initialize logger:
@@ -20,15 +127,20 @@ def main():
     license_input = Settings.license_input
     license_terms_input = Settings.license_terms_input
     output_folder = "output"
+    workers = Settings.export_workers
 
     # Parse the arguments to user
     parser = argparse.ArgumentParser()
     parser.add_argument("-l", "--license_file",
-                        help="Set the input license file")
+                        help="Set the input license file (XLSX or CSV)")
     parser.add_argument("-t", "--license_terms_file",
-                        help="Set the input license terms file")
+                        help="Set the input license terms file (XLSX or CSV)")
     parser.add_argument("-o", "--output_folder",
                         help="The folder to which the XML files will be output")
+    parser.add_argument("-w", "--workers", type=int,
+                        help="The number of processes that build, write and validate the XML files")
+    parser.add_argument("--preflight", action="store_true",
+                        help="Only check the input files for problems (unmapped terms, bad dates, terms without a license) and report them")
 
     logging.info("Parsing Arguments...")
     args = parser.parse_args()
@@ -43,41 +155,92 @@ def main():
     if args.output_folder:
         output_folder = args.output_folder
         logging.debug("Output Folder Specified: " + args.output_folder)
+    if args.workers:
+        workers = args.workers
+        logging.debug("Workers Specified: " + str(args.workers))
+    logging.info("Done.\n\n")
+
+    # Check the HTML backend before any file is parsed, so that a typo in it doesn't stop the run partway through
+    if Settings.clean:
+        try:
+            get_html_stripper(Settings.html_backend)
+        except ValueError as e:
+            logging.error(str(e))
+            exit(1)
+
+    if args.preflight:
+        logging.info("Running pre-flight check...")
+        problem_count = preflight(license_input, license_terms_input)
+        logging.info("Done.\n\n")
+        exit(1 if problem_count > 0 else 0)
+
+    # Check the term mappings before doing any work, so that mistakes in them are found right away
+    logging.info("Checking term mappings...")
+    try:
+        RoamAlmaInterface.compile_term_mappings(Mappings, Settings.xsd_file)
+    except TermMappingError as e:
+        for problem in e.problems:
+            logging.error(problem)
+        logging.error("Conversion stopped, please fix the term mappings above.")
+        exit(1)
     logging.info("Done.\n\n")
 
+    if Settings.stream_pipeline:
+        if workers > 1:
+            logging.warning("The XML files are written by the main process in the streaming pipeline; workers isn't used.")
+        try:
+            stream_pipeline(license_input, license_terms_input, output_folder)
+        except DateConversionError as e:
+            # The license terms dates are all checked before the first file is written
+            log_date_conversion_error(e)
+            exit(1)
+        logging.info("Program completed.")
+        exit(0)
+
     logging.info("Parsing object from json...")
-    # Parse JSON objects from the excel
-    roam_license_objects = convert_xlsx_to_objects(
-        license_input)
+    # Parse JSON objects from the excel (or CSV)
+    # Only the columns used by the conversion are parsed, and they're typed using the ROAM schemas
+    roam_license_objects = load_roam_objects(
+        license_input, RoamAlmaInterface.get_license_columns(Mappings), RoamAlmaInterface.license_schema)
     if len(roam_license_objects) < 1:
         logging.error("No roam license objects were parsed from Excel!")
-    roam_license_term_objects = convert_xlsx_to_objects(
-        license_terms_input)
-    if len(roam_license_objects) < 1:
+    roam_license_term_objects = load_roam_objects(
+        license_terms_input, RoamAlmaInterface.get_license_terms_columns(Mappings), RoamAlmaInterface.license_terms_schema)
+    if len(roam_license_term_objects) < 1:
         logging.error("No roam license terms were parsed from Excel!")
     logging.info("Done.\n\n")
 
     # Convert the date of the objects to Alma format
     logging.info("Fixing object date fields...")
-    date_fixed_roam_license_objects = RoamAlmaInterface.convert_objects_date_to_alma(
-        roam_license_objects, ["Start Date", "End Date"])
-    date_fixed_roam_license_term_objects = RoamAlmaInterface.convert_objects_date_to_alma(
-        roam_license_term_objects, ["Start Date", "End Date"])
+    try:
+        date_fixed_roam_license_objects = RoamAlmaInterface.convert_objects_date_columns_to_alma(
+            roam_license_objects, ["Start Date", "End Date"])
+        date_fixed_roam_license_term_objects = RoamAlmaInterface.convert_objects_date_columns_to_alma(
+            roam_license_term_objects, ["Start Date", "End Date"])
+    except DateConversionError as e:
+        # Report every bad date at once, so they can all be fixed before the next run
+        log_date_conversion_error(e)
+        exit(1)
     logging.info("Done.\n\n")
 
     # Clean the date-fixed objects, if the user wants to
     logging.info("Clean Objects? " + str(Settings.clean))
     if Settings.clean:
         roam_license_objects = clean_json(
-            date_fixed_roam_license_objects, remove_newline=Settings.remove_newline)
+            date_fixed_roam_license_objects, remove_newline=Settings.remove_newline,
+            workers=Settings.clean_workers, chunk_size=Settings.clean_chunk_size, html_backend=Settings.html_backend)
         if len(roam_license_objects) < 1:
             logging.error("Cleaned license objects array empty!")
     if Settings.clean:
         roam_license_term_objects = clean_json(
-            date_fixed_roam_license_term_objects, remove_newline=Settings.remove_newline)
+            date_fixed_roam_license_term_objects, remove_newline=Settings.remove_newline,
+            workers=Settings.clean_workers, chunk_size=Settings.clean_chunk_size, html_backend=Settings.html_backend)
         if len(roam_license_term_objects) < 1:
             logging.error("Cleaned license term objects array empty!")
     if Settings.clean:
+        cache_info = clean_cache_info()
+        logging.info("Cleaned value cache: {} hits, {} misses".format(
+            cache_info.hits, cache_info.misses))
         logging.info("Done.\n\n")
 
     # Initialize the Roam to Alma Interface
@@ -100,11 +263,17 @@ def main():
     # Combine the Licenses and License Terms (logging is in the method)
     roam_alma_interface.combine_roam_license_and_license_terms()
 
-    # Generate generateDS instances (logging is in the method)
-    roam_alma_interface.create_generateds_instances()
+    # Replace the combined licenses with their compact models, releasing the converted license terms (logging is in
+    # the method)
+    del converted_roam_license_terms
+    roam_alma_interface.create_license_models()
 
-    # Export the instances to XML and validate them (logging is in the method)
-    roam_alma_interface.export_validate_generateds_instances(output_folder)
+    if workers > 1:
+        # Generate, export and validate the XML in a pool of processes (logging is in the method)
+        roam_alma_interface.export_validate_licenses_parallel(output_folder, workers)
+    else:
+        # Generate the XML of each license, export and validate it (logging is in the method)
+        roam_alma_interface.export_validate_licenses(output_folder)
 
     logging.info("Program completed.")
     exit(0)
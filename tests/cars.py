@@ -0,0 +1,8 @@
+def create_car(make, model, engine, hp):
+    """Create a row of the car test files in tests/testdata, as the parsers return it"""
+    return {
+        "Make": make,
+        "Model": model,
+        "Engine": engine,
+        "HP": hp
+    }
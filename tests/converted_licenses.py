@@ -0,0 +1,24 @@
+def create_converted_license(name="Wiley & Sons", start_date="20200512", end_date=None, uri="", license_status="ACTIVE",
+                             terms=(), notes=()):
+    """Create a converted license dict, as RoamAlmaInterface converts and combines them
+
+    Input: License name, start date, end date (left out if None), URI, license status, (term code, term value) pairs,
+    note contents (all optional)
+    Output: Converted license dict"""
+    converted_license = {
+        "license_details": {
+            "ownered_entity": {"created_by": "USMAI ROAM License to Alma License Converter"},
+            "license_name": name,
+            "license_code": "ROAM-0",
+            "license_status": license_status,
+            "review_status": "ACCEPTED",
+            "start_date": start_date,
+            "URI": uri,
+            "type": "LICENSE"
+        },
+        "term_list": [{"term_code": term_code, "term_value": term_value} for term_code, term_value in terms],
+        "note_list": [{"content": content} for content in notes]
+    }
+    if end_date is not None:
+        converted_license["license_details"]["end_date"] = end_date
+    return converted_license
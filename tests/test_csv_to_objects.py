@@ -1,14 +1,12 @@
 import unittest
 
-from bin.csv_to_objects import clean_csv, convert_csv_to_objects
+import types
+from datetime import datetime
 
-def create_car(make, model, engine, hp):
-    return {
-        "Make": make,
-        "Model": model,
-        "Engine": engine,
-        "HP": hp
-    }
+from bin.csv_to_objects import convert_csv_to_objects, iter_csv_rows
+from bin.roam_to_alma_interface import RoamAlmaInterface
+from bin.xlsx_to_objects import convert_xlsx_to_objects
+from tests.cars import create_car
 
 
 class TestCsvToObjects(unittest.TestCase):
@@ -31,34 +29,38 @@ class TestCsvToObjects(unittest.TestCase):
         input_filepath = 'tests/testdata/test_clean_html_simple_input.csv'
         expected_ouput_filepath = 'tests/testdata/test_clean_html_simple_output.csv'
 
-        # clean the CSV, which creates a temporary file
-        cleaned_csv_filepath = clean_csv(input_filepath)
-
-        try:
-            # Try to open the expected (correct) file
-            expected_file = open(expected_ouput_filepath, "r")
-            try:
-                # Try to open the actual (cleaned) file
-                actual_file = open(cleaned_csv_filepath, "r")
-
-                try:
-                    # Get the text from each file to compare
-                    expected_text = expected_file.read()
-                    actual_text = actual_file.read()
-
-                    # Assert that the text from each is
-                    self.assertEqual(expected_text, actual_text)
-                finally:
-                    actual_file.close()
-
-            except FileNotFoundError as e:
-                print("File Not Found: " + e.__str__())
-            finally:
-                expected_file.close()
-
-        except FileNotFoundError as e:
-            print("File Not Found: " + e.__str__())
-        
+        # Clean the CSV rows while parsing them
+        cleaned_csv_parsed_objects = convert_csv_to_objects(
+            input_filepath, clean=True)
+
+        # Assert they're equal to the rows of the expected (correct) file
+        self.assertListEqual(cleaned_csv_parsed_objects,
+                             convert_csv_to_objects(expected_ouput_filepath))
+
+    def test_iter_csv_rows(self):
+        filepath = 'tests/testdata/test_standard_csv.csv'
+
+        csv_rows = iter_csv_rows(filepath, {"Make", "HP"})
+        self.assertIsInstance(csv_rows, types.GeneratorType)
+
+        self.assertListEqual(list(csv_rows), [
+            {"Make": "Ford", "HP": "181"},
+            {"Make": "Mazda", "HP": "184"},
+            {"Make": "Subaru", "HP": "170"}
+        ])
+
+    def test_roam_csv_matches_xlsx(self):
+        """Test that a ROAM CSV export gives the same rows as the XLSX export, including the typed columns"""
+        schema = RoamAlmaInterface.license_terms_schema
+        csv_parsed_objects = convert_csv_to_objects(
+            'tests/testdata/simple_roam_test.csv', schema=schema)
+        xlsx_parsed_objects = convert_xlsx_to_objects(
+            'tests/testdata/simple_roam_test.xlsx', schema=schema)
+
+        self.assertListEqual(csv_parsed_objects, xlsx_parsed_objects)
+        self.assertIs(csv_parsed_objects[0]["Active"], True)
+        self.assertEqual(
+            csv_parsed_objects[0]["Start Date"], datetime(2020, 5, 12))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,66 @@
+import unittest
+from datetime import date, datetime
+
+from pandas import Timestamp
+
+from bin.date_parser import convert_date_to_alma, parse_date
+
+
+class TestDateParser(unittest.TestCase):
+
+    def test_parse_date_strings(self):
+        self.assertEqual(parse_date("05/12/2020"), datetime(2020, 5, 12))
+        self.assertEqual(parse_date("5/2/2020"), datetime(2020, 5, 2))
+        self.assertEqual(parse_date("2020-05-12"), datetime(2020, 5, 12))
+        self.assertEqual(parse_date(" 2020-05-12 "), datetime(2020, 5, 12))
+        self.assertEqual(parse_date("2020-05-12 13:45:00"), datetime(2020, 5, 12))
+        self.assertEqual(parse_date("2020-05-12T13:45"), datetime(2020, 5, 12))
+
+    def test_parse_excel_serials(self):
+        self.assertEqual(parse_date(43963), datetime(2020, 5, 12))
+        self.assertEqual(parse_date(43963.0), datetime(2020, 5, 12))
+        self.assertEqual(parse_date("43963"), datetime(2020, 5, 12))
+        # Excel counts a 29th of February 1900 that didn't exist
+        self.assertEqual(parse_date(61), datetime(1900, 3, 1))
+
+    def test_parse_native_dates(self):
+        self.assertEqual(parse_date(datetime(2022, 2, 25, 12, 12)), datetime(2022, 2, 25, 12, 12))
+        self.assertEqual(parse_date(date(2022, 2, 25)), datetime(2022, 2, 25))
+        self.assertEqual(parse_date(Timestamp(year=2022, month=2, day=25, hour=12)),
+                         datetime(2022, 2, 25, 12))
+
+    def test_parse_invalid_dates(self):
+        for value in ["Next year", "31/12/2030", "2020-13-01", "02/30/2020", "", 0, -5, True, None,
+                      "2020", " 2020 ", "61", "439630"]:
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_date(value)
+
+    def test_bool_not_cached_as_number(self):
+        self.assertEqual(parse_date(1), datetime(1900, 1, 1))
+        self.assertEqual(convert_date_to_alma(1), "19000101")
+        for value in [True, False]:
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                convert_date_to_alma(value)
+        with self.assertRaises(ValueError):
+            parse_date(True)
+
+    def test_convert_date_to_alma(self):
+        self.assertEqual(convert_date_to_alma("05/12/2020"), "20200512")
+        self.assertEqual(convert_date_to_alma("2020-05-12"), "20200512")
+        self.assertEqual(convert_date_to_alma(43963), "20200512")
+        self.assertEqual(convert_date_to_alma(Timestamp(year=2022, month=2, day=25, hour=12)), "20220225")
+        self.assertEqual(convert_date_to_alma(""), "")
+
+    def test_convert_date_to_alma_memoized(self):
+        convert_date_to_alma.cache_clear()
+        for _ in range(10):
+            convert_date_to_alma("07/24/2020")
+
+        cache_info = convert_date_to_alma.cache_info()
+        self.assertEqual(cache_info.misses, 1)
+        self.assertEqual(cache_info.hits, 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
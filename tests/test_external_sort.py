@@ -0,0 +1,40 @@
+import os
+import random
+import tempfile
+import types
+import unittest
+from operator import itemgetter
+
+from bin.external_sort import external_sort
+
+
+class TestExternalSort(unittest.TestCase):
+
+    def setUp(self):
+        randomizer = random.Random(0)
+        # The items hold dicts and repeated strings, as the license terms do
+        self.items = [(randomizer.randint(0, 20), position, {"name": "License " + str(position % 7), "terms": [position]})
+                      for position in range(500)]
+
+    def test_sort_in_memory(self):
+        sorted_items = external_sort(self.items, key=itemgetter(0))
+
+        self.assertIsInstance(sorted_items, types.GeneratorType)
+        self.assertListEqual(list(sorted_items), sorted(self.items, key=itemgetter(0)))
+
+    def test_sort_on_disk(self):
+        with tempfile.TemporaryDirectory() as temp_folder:
+            # Only 30 items at a time in memory, so the items are sorted in 17 runs on disk
+            sorted_items = list(external_sort(
+                iter(self.items), key=itemgetter(0), max_items_in_memory=30, temp_folder=temp_folder))
+
+            # The sort is stable, and the runs are removed afterwards
+            self.assertListEqual(sorted_items, sorted(self.items, key=itemgetter(0)))
+            self.assertListEqual(os.listdir(temp_folder), [])
+
+    def test_sort_empty(self):
+        self.assertListEqual(list(external_sort([], max_items_in_memory=1)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
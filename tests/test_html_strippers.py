@@ -0,0 +1,56 @@
+import unittest
+
+from bin.html_strippers import HTML_STRIPPERS, get_html_stripper, strip_html_beautifulsoup, strip_html_htmlparser
+from bin.xlsx_to_objects import clean_json, convert_xlsx_to_objects
+from tests.cars import create_car
+
+
+class TestHtmlStrippers(unittest.TestCase):
+
+    # Values all the backends agree on
+    common_values = [
+        "",
+        "Plain text",
+        "<p>Paragraph</p> and <b>bold</b>",
+        '<div class="row">2.5na</div>',
+        "<ul><li>One</li>\n<li>Two</li></ul>",
+        "Fish &amp; Chips &lt;tasty&gt;",
+        "A & B, x < y",
+        "Reserved&nbsp;&copy; 2020",
+        "&#39;quoted&#x27;",
+        "<!-- a comment -->text",
+        "<script>var x = 1;</script>after",
+    ]
+
+    def test_backends_agree_on_common_values(self):
+        for html_backend, strip_html in HTML_STRIPPERS.items():
+            for value in self.common_values:
+                with self.subTest(html_backend=html_backend, value=value):
+                    self.assertEqual(strip_html(value),
+                                     strip_html_beautifulsoup(value))
+
+    def test_htmlparser_keeps_cdata(self):
+        self.assertEqual(strip_html_htmlparser(
+            "<![CDATA[kept]]> text"), strip_html_beautifulsoup("<![CDATA[kept]]> text"))
+
+    def test_clean_html_xlsx_with_each_backend(self):
+        expected_objects = [
+            create_car("Ford", "Fusion", "1.5t", 181),
+            create_car("Mazda", 6, "2.5na", 184),
+            create_car("Subaru", "Forester   ", "2.5na", 170)
+        ]
+        xlsx_parsed_objects = convert_xlsx_to_objects(
+            'tests/testdata/test_clean_html_complex_input.xlsx')
+
+        for html_backend in HTML_STRIPPERS:
+            with self.subTest(html_backend=html_backend):
+                self.assertListEqual(clean_json(
+                    xlsx_parsed_objects, html_backend=html_backend), expected_objects)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_html_stripper("html5lib")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from bin.license_codes import LicenseCodeRegistry, hash_license_code
+
+
+def reserve_license_codes(filepath, license_keys):
+    """Reserve codes in a registry from another process"""
+    registry = LicenseCodeRegistry(filepath, "ROAM")
+    registry.reserve_codes(license_keys)
+    return [registry.get_code(*license_key) for license_key in license_keys]
+
+
+class TestHashLicenseCode(unittest.TestCase):
+
+    def test_hash_license_code(self):
+        code = hash_license_code("ROAM", "Wiley", "20200512")
+
+        self.assertRegex(code, r"^ROAM-[0-9A-F]{12}$")
+        self.assertEqual(hash_license_code("ROAM", "Wiley", "20200512"), code)
+        self.assertNotEqual(hash_license_code("ROAM", "Wiley", "20200513"), code)
+        self.assertNotEqual(hash_license_code("ROAM", "Wiley2020", "0512"), hash_license_code("ROAM", "Wiley", "20200512"))
+
+
+class TestLicenseCodeRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry_folder = tempfile.mkdtemp()
+        self.registry_filepath = os.path.join(self.registry_folder, "license_codes.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.registry_folder)
+
+    def test_codes_kept_between_runs(self):
+        registry = LicenseCodeRegistry(self.registry_filepath, "ROAM")
+        registry.reserve_codes([("Wiley", "20200512"), ("Elsevier", "20190101"), ("Wiley", "20200512")])
+
+        self.assertEqual(registry.get_code("Wiley", "20200512"), "ROAM-0")
+        self.assertEqual(registry.get_code("Elsevier", "20190101"), "ROAM-1")
+
+        # A later run, with the licenses in another order and a new license
+        registry = LicenseCodeRegistry(self.registry_filepath, "ROAM")
+        self.assertEqual(registry.get_code("Springer", "20210101"), "ROAM-2")
+        self.assertEqual(registry.get_code("Elsevier", "20190101"), "ROAM-1")
+        self.assertEqual(registry.get_code("Wiley", "20200512"), "ROAM-0")
+
+    def test_codes_given_by_other_registries(self):
+        first_registry = LicenseCodeRegistry(self.registry_filepath, "ROAM")
+        second_registry = LicenseCodeRegistry(self.registry_filepath, "ROAM")
+
+        self.assertEqual(first_registry.get_code("Wiley", "20200512"), "ROAM-0")
+        # The second registry was read before the first gave out ROAM-0, but doesn't give it out again
+        self.assertEqual(second_registry.get_code("Elsevier", "20190101"), "ROAM-1")
+        self.assertEqual(second_registry.get_code("Wiley", "20200512"), "ROAM-0")
+
+    def test_parallel_processes(self):
+        license_keys = [("License " + str(i), "20200512") for i in range(20)]
+        shards = [license_keys[0:12], license_keys[8:20], license_keys[4:16], list(reversed(license_keys))]
+
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            shard_codes = list(executor.map(
+                reserve_license_codes, [self.registry_filepath] * len(shards), shards))
+
+        # Every process got the same code for the same license, and no two licenses share a code
+        codes = {}
+        for shard, license_codes in zip(shards, shard_codes):
+            for license_key, code in zip(shard, license_codes):
+                self.assertEqual(codes.setdefault(license_key, code), code)
+        self.assertEqual(len(set(codes.values())), len(license_keys))
+
+        registry = LicenseCodeRegistry(self.registry_filepath, "ROAM")
+        self.assertDictEqual(registry.codes, codes)
+        self.assertEqual(registry.next_number, len(license_keys))
+
+
+if __name__ == '__main__':
+    unittest.main()
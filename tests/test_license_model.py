@@ -0,0 +1,93 @@
+import copy
+import pickle
+import tracemalloc
+import unittest
+
+from bin.license_model import License, LicenseNote, LicenseTerm, as_license_model
+from bin.license_serializers import serialize_license_lxml, serialize_license_template
+from bin.roam_to_alma_interface import RoamAlmaInterface
+from config.config_test import Mappings, Settings
+from tests.converted_licenses import create_converted_license
+
+
+class TestLicenseModel(unittest.TestCase):
+
+    def test_from_converted_license(self):
+        converted_license = create_converted_license(
+            "Wiley", end_date="20210101", terms=[("PRINTCOPY", "PERMITTED"), ("PRINTCOPYN", "Desc")], notes=["Note"])
+
+        license_model = License.from_converted_license(converted_license)
+
+        self.assertEqual(license_model.license_name, "Wiley")
+        self.assertEqual(license_model.end_date, "20210101")
+        self.assertTupleEqual(license_model.terms, (LicenseTerm("PRINTCOPY", "PERMITTED"), LicenseTerm("PRINTCOPYN", "Desc")))
+        self.assertTupleEqual(license_model.notes, (LicenseNote("Note"),))
+        self.assertDictEqual(license_model.to_converted_license(), converted_license)
+        self.assertIsNone(License.from_converted_license(create_converted_license("Wiley")).end_date)
+        self.assertFalse(hasattr(license_model, "__dict__"))
+
+    def test_shared_objects(self):
+        shared_objects = {}
+        license_models = [as_license_model(create_converted_license(
+            "License " + str(i), terms=[("PRINTCOPY", "PERMITTED"), ("COPY_N", "Desc " + str(i))],
+            notes=["Same note"]), shared_objects) for i in range(3)]
+
+        self.assertIs(license_models[0].terms[0], license_models[2].terms[0])
+        self.assertIs(license_models[0].notes[0], license_models[2].notes[0])
+        self.assertIsNot(license_models[0].terms[1], license_models[2].terms[1])
+        self.assertIs(as_license_model(license_models[0]), license_models[0])
+        self.assertEqual(pickle.loads(pickle.dumps(license_models)), license_models)
+
+    def test_same_xml(self):
+        converted_license = create_converted_license(
+            "Wiley & Sons", end_date="20210101", terms=[("PRINTCOPY", "PERMITTED")], notes=["Note <b>"])
+        license_model = as_license_model(converted_license)
+
+        for serialize_license in [serialize_license_lxml, serialize_license_template]:
+            self.assertEqual(serialize_license(license_model), serialize_license(converted_license))
+
+        alma_interface = RoamAlmaInterface([], [], Mappings, Settings)
+        create_generateds_instance = alma_interface._RoamAlmaInterface__create_generateds_instance
+        self.assertEqual(create_generateds_instance(license_model).get_license_details().get_end_date(), "20210101")
+        self.assertEqual(len(create_generateds_instance(license_model).get_term_list().get_term()), 1)
+
+    def test_less_memory(self):
+        converted_licenses = [create_converted_license(
+            "License " + str(i), end_date="20210101",
+            terms=[("PRINTCOPY", "PERMITTED"), ("COPY", "SILENT")] * 10 + [("COPY_N", "Desc " + str(i))],
+            notes=["Summary " + str(i)]) for i in range(100)]
+
+        allocated = {}
+        for representation, value in [("dicts", converted_licenses),
+                                      ("models", [as_license_model(converted_license, {})
+                                                  for converted_license in converted_licenses])]:
+            dump = pickle.dumps(value)
+            tracemalloc.start()
+            value_copy = pickle.loads(dump)
+            allocated[representation] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del value_copy
+
+        self.assertLess(allocated["models"], allocated["dicts"] / 2)
+
+
+class TestCreateLicenseModels(unittest.TestCase):
+
+    def test_create_license_models(self):
+        roam_licenses = [{"Name": "License " + str(i), "Start Date": "20200512", "End Date": "", "License Links": ""}
+                         for i in range(3)]
+        alma_interface = RoamAlmaInterface(copy.deepcopy(roam_licenses), [], Mappings, Settings)
+        converted_licenses = copy.deepcopy(alma_interface.get_converted_license_objects())
+        self.assertListEqual(alma_interface.get_converted_license_term_objects(), [])
+
+        with self.assertLogs(level="INFO"):
+            license_models = alma_interface.create_license_models()
+
+        self.assertIs(alma_interface.converted_roam_licenses, license_models)
+        self.assertListEqual([license_model.to_converted_license() for license_model in license_models],
+                             converted_licenses)
+        self.assertIsNone(alma_interface.converted_roam_license_terms)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import copy
+import glob
+import io
+import os
+import tempfile
+import unittest
+
+import xmlschema
+
+from bin.csv_to_objects import convert_csv_to_objects
+from bin.license_serializers import escape_xml, serialize_license_lxml, serialize_license_template, _term_fragment
+from bin.roam_to_alma_interface import RoamAlmaInterface
+from bin.xlsx_to_objects import clean_json, convert_xlsx_to_objects
+from config.config_test import Mappings, Settings
+from tests.converted_licenses import create_converted_license
+
+
+class TestSerializeLicense(unittest.TestCase):
+
+    def setUp(self):
+        self.alma_interface = RoamAlmaInterface([], [], Mappings, Settings)
+
+    def export_generateds(self, converted_license, compact):
+        generateds_instance = self.alma_interface._RoamAlmaInterface__create_generateds_instance(
+            copy.deepcopy(converted_license))
+        output = io.StringIO()
+        generateds_instance.export(output, level=0, namespacedef_=self.alma_interface.namespace,
+                                   pretty_print=not compact)
+        return output.getvalue().encode("utf-8")
+
+    def assertSameXml(self, converted_license):
+        # Both serializers write exactly what generateDS writes, indented and compact
+        for compact in [False, True]:
+            expected_xml = self.export_generateds(converted_license, compact)
+            self.assertEqual(serialize_license_lxml(converted_license, compact), expected_xml)
+            self.assertEqual(serialize_license_template(converted_license, compact), expected_xml)
+
+    def test_roam_fixtures(self):
+        # Convert each ROAM test export to a license, as handle.py does
+        for filepath in ["tests/testdata/simple_roam_test.xlsx", "tests/testdata/simple_roam_test.csv"]:
+            with self.subTest(filepath=filepath):
+                if filepath.endswith(".csv"):
+                    roam_license_terms = convert_csv_to_objects(filepath)
+                else:
+                    roam_license_terms = convert_xlsx_to_objects(filepath)
+                roam_license_terms = clean_json(RoamAlmaInterface.convert_objects_date_to_alma(
+                    roam_license_terms, ["Start Date", "End Date"]))
+                roam_licenses = [{"Name": roam_license_term["License Name"], "Start Date": roam_license_term["Start Date"],
+                                  "End Date": roam_license_term["End Date"], "License Links": ""}
+                                 for roam_license_term in roam_license_terms]
+
+                alma_interface = RoamAlmaInterface(roam_licenses, roam_license_terms, Mappings, Settings)
+                alma_interface.get_converted_license_objects()
+                alma_interface.get_converted_license_term_objects()
+                alma_interface.combine_roam_license_and_license_terms()
+
+                for converted_license in alma_interface.converted_roam_licenses:
+                    self.assertGreater(len(converted_license["term_list"]), 0)
+                    self.assertSameXml(converted_license)
+
+    def test_fixture_values(self):
+        # Every value of every test file, as written in it (HTML, entities, unicode, numbers), as notes and terms
+        filepaths = sorted(glob.glob("tests/testdata/*.xlsx") + glob.glob("tests/testdata/*.csv"))
+        for filepath in filepaths:
+            with self.subTest(filepath=filepath):
+                if filepath.endswith(".csv"):
+                    rows = convert_csv_to_objects(filepath)
+                else:
+                    rows = convert_xlsx_to_objects(filepath)
+                values = [value for row in rows for value in row.values()]
+
+                self.assertSameXml(create_converted_license(
+                    "Test", terms=[("COPY_N", value) for value in values], notes=values))
+
+    def test_optional_elements(self):
+        self.assertSameXml(create_converted_license("No terms or notes"))
+        self.assertSameXml(create_converted_license(
+            "End date & <markup>", end_date="20210101", uri="http://example.com/?a=1&b=\"2\"",
+            terms=[("PRINTCOPY", "PERMITTED")], notes=["Café ]]> 'quoted'"]))
+        self.assertSameXml(create_converted_license("Empty values", uri=None, terms=[("COPY_N", "")], notes=[0]))
+
+    def test_cdata(self):
+        # generateDS (and so the template serializer) writes CDATA sections as they are, where lxml escapes them
+        converted_license = create_converted_license(
+            "CDATA", terms=[("COPY_N", "a <![CDATA[<b> & c]]> d & e")], notes=["<![CDATA[x]]>"])
+
+        for compact in [False, True]:
+            self.assertEqual(serialize_license_template(converted_license, compact),
+                             self.export_generateds(converted_license, compact))
+
+    def test_escape_xml(self):
+        value = "PERMITTED"
+        self.assertIs(escape_xml(value), value)
+        self.assertEqual(escape_xml("A & <B>"), "A &amp; &lt;B&gt;")
+        self.assertEqual(escape_xml("]]>"), "]]&gt;")
+        self.assertEqual(escape_xml(None), "")
+        self.assertEqual(escape_xml(12), "12")
+
+    def test_term_fragments_memoized(self):
+        _term_fragment.cache_clear()
+        converted_licenses = [create_converted_license("License " + str(i), terms=[("PRINTCOPY", "PERMITTED"),
+                                                                                  ("COPY", "SILENT")])
+                              for i in range(10)]
+        for converted_license in converted_licenses:
+            serialize_license_template(converted_license)
+
+        cache_info = _term_fragment.cache_info()
+        self.assertEqual(cache_info.misses, 2)
+        self.assertEqual(cache_info.hits, 18)
+
+    def test_valid_xml(self):
+        converted_license = create_converted_license(
+            "Wiley & Sons", end_date="20210101", terms=[("PRINTCOPY", "PERMITTED")], notes=["Note"])
+
+        xmlschema.validate(serialize_license_lxml(converted_license).decode("utf-8"), Settings.xsd_file)
+
+
+class TestExportValidateLicenses(unittest.TestCase):
+
+    def export_validate_licenses(self, roam_licenses, serializer, compact):
+        class SerializerSettings(Settings):
+            # The official XSD only allows its own license codes
+            xsd_file = "config/erm_license_edited.xsd"
+            xml_serializer = serializer
+            compact_xml = compact
+
+        alma_interface = RoamAlmaInterface(copy.deepcopy(roam_licenses), [], Mappings, SerializerSettings)
+        alma_interface.get_converted_license_objects()
+
+        output_files = {}
+        with tempfile.TemporaryDirectory() as output_folder, self.assertLogs(level="INFO"):
+            self.assertEqual(alma_interface.export_validate_licenses(output_folder), len(roam_licenses))
+            for file_name in os.listdir(output_folder):
+                with open(os.path.join(output_folder, file_name), "rb") as output_file:
+                    output_files[file_name] = output_file.read()
+        return output_files
+
+    def test_serializers_write_same_files(self):
+        roam_licenses = [{"Name": "License & " + str(i), "Start Date": "20200512", "End Date": "", "License Links": ""}
+                         for i in range(3)]
+
+        for compact in [False, True]:
+            with self.subTest(compact=compact):
+                generateds_files = self.export_validate_licenses(roam_licenses, "generateds", compact)
+
+                self.assertEqual(len(generateds_files), 3)
+                self.assertEqual(all(b"\n" not in xml for xml in generateds_files.values()), compact)
+                for serializer in ["lxml", "template"]:
+                    self.assertDictEqual(
+                        self.export_validate_licenses(roam_licenses, serializer, compact), generateds_files)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from bin.preflight import LICENSE_KEY_COLUMNS, LICENSE_TERMS_KEY_COLUMNS, find_input_problems, get_key_schema
+from bin.roam_to_alma_interface import RoamAlmaInterface
+from bin.xlsx_to_objects import convert_xlsx_to_objects
+from config.config_test import Mappings, Settings
+
+
+def create_license(name, start_date, end_date=""):
+    return {"Name": name, "Start Date": start_date, "End Date": end_date}
+
+
+def create_license_term(name, license_name, allowed, start_date, end_date=""):
+    return {"Name": name, "License Name": license_name, "Allowed": allowed,
+            "Start Date": start_date, "End Date": end_date}
+
+
+class TestPreflight(unittest.TestCase):
+
+    def test_no_problems(self):
+        licenses = [create_license("Wiley", "05/12/2020", "2020-07-24")]
+        license_terms = [
+            create_license_term("Printing", "Wiley", "yes", "2020-05-12"),
+            create_license_term("archiving", "Wiley", "N/A", "05/12/2020"),
+            create_license_term("Authentication", "Wiley", "", "05/12/2020")
+        ]
+
+        self.assertListEqual(find_input_problems(
+            licenses, license_terms, Mappings, Settings.xsd_file), [])
+
+    def test_all_problems_reported(self):
+        licenses = [create_license("Wiley", "05/12/2020"),
+                    create_license("Elsevier", "Last year")]
+        license_terms = [
+            create_license_term("Walk-ins", "Wiley", "yes", "05/12/2020"),
+            create_license_term("Printing", "Wiley", "maybe", "05/12/2020"),
+            create_license_term("Printing", "Wiley", "yes", "05/12/2020", "31/12/2030"),
+            create_license_term("Printing", "Springer", "yes", "05/12/2020"),
+            create_license_term("Walk-ins", "Wiley", "no", "05/13/2020")
+        ]
+
+        problems = find_input_problems(
+            licenses, license_terms, Mappings, Settings.xsd_file)
+
+        self.assertListEqual(problems, [
+            "Start Date 'Last year' can't be converted to Alma format (licenses row 3)",
+            "End Date '31/12/2030' can't be converted to Alma format (license terms row 4)",
+            "ROAM term 'Walk-ins' isn't in Mappings.term_mappings (license terms rows 2, 6)",
+            "Allowed value 'maybe' of ROAM term 'Printing' isn't in Mappings.term_value_mappings['PRINTCOPY'] "
+            "(license terms row 3)",
+            "No license named 'Springer' with start date '20200512' for license terms row 5",
+            "No license named 'Wiley' with start date '20200513' for license terms row 6"
+        ])
+
+    def test_mapping_problems_reported(self):
+        class BadMappings(Mappings):
+            term_mappings = {"Printing": ["PRINTCOPY", "PRINTCOPYN"]}
+            term_value_mappings = {}
+
+        problems = find_input_problems([], [], BadMappings, Settings.xsd_file)
+
+        self.assertEqual(len(problems), 1)
+
+    def test_key_columns(self):
+        filepath = "tests/testdata/simple_roam_test.xlsx"
+
+        license_terms = convert_xlsx_to_objects(
+            filepath, LICENSE_TERMS_KEY_COLUMNS,
+            get_key_schema(RoamAlmaInterface.license_terms_schema, LICENSE_TERMS_KEY_COLUMNS))
+
+        self.assertSetEqual(set(license_terms[0]), set(LICENSE_TERMS_KEY_COLUMNS))
+        self.assertTrue(set(LICENSE_KEY_COLUMNS) <= set(RoamAlmaInterface.license_schema))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from datetime import date, datetime
+
+from bin.roam_schema import BOOLEAN, DATE, STRING, convert_boolean, convert_date, convert_string, get_converters
+
+
+class TestRoamSchema(unittest.TestCase):
+
+    def test_convert_string(self):
+        self.assertEqual(convert_string("Wiley"), "Wiley")
+        self.assertEqual(convert_string(None), "")
+        self.assertEqual(convert_string(6), "6")
+        self.assertEqual(convert_string(6.0), "6")
+        self.assertEqual(convert_string(2.5), "2.5")
+
+    def test_convert_boolean(self):
+        self.assertIs(convert_boolean(True), True)
+        self.assertIs(convert_boolean(False), False)
+        self.assertIs(convert_boolean("TRUE"), True)
+        self.assertIs(convert_boolean(" yes "), True)
+        self.assertIs(convert_boolean("false"), False)
+        self.assertIs(convert_boolean(""), False)
+        self.assertIs(convert_boolean(None), False)
+        self.assertIs(convert_boolean(1), True)
+
+    def test_convert_date(self):
+        self.assertEqual(convert_date(datetime(2022, 2, 25, 12, 12)),
+                         datetime(2022, 2, 25, 12, 12))
+        self.assertEqual(convert_date(date(2022, 2, 25)), datetime(2022, 2, 25))
+        self.assertEqual(convert_date("02/25/2022"), datetime(2022, 2, 25))
+        self.assertEqual(convert_date("2022-02-25"), datetime(2022, 2, 25))
+        self.assertEqual(convert_date(
+            "2022-02-25 00:00:00"), datetime(2022, 2, 25))
+        self.assertEqual(convert_date(None), "")
+        self.assertEqual(convert_date(""), "")
+
+    def test_convert_unparseable_date(self):
+        """Unparseable dates are left as they are, to be reported when converting them to Alma format"""
+        self.assertEqual(convert_date("Sometime in 2022"), "Sometime in 2022")
+        self.assertEqual(convert_date("25/02/2022"), "25/02/2022")
+
+    def test_get_converters(self):
+        converters = get_converters(
+            {"Name": STRING, "Active": BOOLEAN, "Start Date": DATE})
+
+        self.assertIs(converters["Name"], convert_string)
+        self.assertIs(converters["Active"], convert_boolean)
+        self.assertIs(converters["Start Date"], convert_date)
+        self.assertDictEqual(get_converters(None), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,16 @@
 import unittest
 
-from bin.roam_to_alma_interface import RoamAlmaInterface
+from bin.roam_to_alma_interface import DateConversionError, RoamAlmaInterface, TermMappingError
 from bin.xlsx_to_objects import clean_json, convert_xlsx_to_objects
+import copy
 import json
+import os
+import tempfile
 from datetime import datetime
+from unittest import mock
 from pandas import Timestamp
 from config.config_test import Mappings, Settings
+from tests.converted_licenses import create_converted_license
 
 
 class TestConvertRoamTermToAlma(unittest.TestCase):
@@ -97,6 +102,65 @@ class TestConvertRoamTermToAlma(unittest.TestCase):
                 self.assertDictEqual(actual_term, expected_result[idx])
 
 
+class TestCompileTermMappings(unittest.TestCase):
+
+    def test_compile_term_mappings(self):
+        term_plan = RoamAlmaInterface.compile_term_mappings(Mappings, Settings.xsd_file)
+
+        self.assertEqual(len(term_plan), len(Mappings.term_mappings))
+        self.assertTupleEqual(term_plan["archiving"], ("ARCHIVE", "ARCHIVEN", {
+                              "yes": "YES", "no": "NO", "n/a": "YES"}))
+        self.assertTupleEqual(term_plan["authentication"], ("", "AUTHUSERDEF", None))
+
+    def test_term_codes_from_xsd(self):
+        term_codes = RoamAlmaInterface.get_xsd_term_codes(Settings.xsd_file)
+        self.assertIn("DIGCOPY", term_codes)
+
+        # The edited XSD allows any term code
+        self.assertIsNone(RoamAlmaInterface.get_xsd_term_codes("config/erm_license_edited.xsd"))
+
+    def test_invalid_term_mappings(self):
+        class BadMappings(Mappings):
+            term_mappings = {
+                "Printing": ["PRINTCOPY", "PRINTCOPYN"],
+                "printing ": ["DIGCOPY", "DIGCOPYN"],
+                "Walk-ins": ["WALKINS", ""],
+                "Copying": ["DIGCOPY"]
+            }
+            term_value_mappings = {
+                "DIGCOPY": {"yes": "PERMITTED", "no": "PROHIBITED", "n/a": "SILENT"}
+            }
+
+        with self.assertRaises(TermMappingError) as context:
+            RoamAlmaInterface.compile_term_mappings(BadMappings, Settings.xsd_file)
+
+        # Every problem is reported at once
+        self.assertEqual(len(context.exception.problems), 5)
+
+        # Unknown term codes are only caught when the XSD enumerates them
+        with self.assertRaises(TermMappingError) as context:
+            RoamAlmaInterface.compile_term_mappings(BadMappings, "config/erm_license_edited.xsd")
+        self.assertEqual(len(context.exception.problems), 4)
+
+    def test_term_names_and_values_ignore_case(self):
+        alma_interface = RoamAlmaInterface([], [], Mappings, Settings)
+
+        terms = alma_interface._RoamAlmaInterface__convert_license_term_to_alma(
+            " printing", "", "Yes", "")
+
+        self.assertListEqual(terms, [{"term_code": "PRINTCOPY", "term_value": "PERMITTED"}])
+
+    def test_unmapped_terms(self):
+        alma_interface = RoamAlmaInterface([], [], Mappings, Settings)
+
+        with self.assertRaises(TermMappingError):
+            alma_interface._RoamAlmaInterface__convert_license_term_to_alma(
+                "Walk-ins", "", "yes", "")
+        with self.assertRaises(TermMappingError):
+            alma_interface._RoamAlmaInterface__convert_license_term_to_alma(
+                "Printing", "", "maybe", "")
+
+
 class TestConvertRoamObjectToAlmaJson(unittest.TestCase):
 
     def test_convert_normal_roam_to_alma_json(self):
@@ -169,6 +233,406 @@ class TestConvertRoamObjectToAlmaJson(unittest.TestCase):
                          string_of_expected_object)
 
 
+def legacy_combine(licenses, license_terms):
+    """The original combine loop, which scanned every license terms object for every license"""
+    license_terms_matched = 0
+    for license in licenses:
+        for license_term_object in license_terms:
+            if (license_term_object["license_details"]["license_name"] == license["license_details"]["license_name"]) and (license_term_object["license_details"]["start_date"] == license["license_details"]["start_date"]):
+                license_term_object["matched"] = license_term_object.get("matched", 0) + 1
+                license_terms_matched += 1
+                for license_term in license_term_object["term_list"]:
+                    license["term_list"].append(license_term)
+                if len(license['note_list']) == 0:
+                    license['note_list'] = license_term_object['note_list']
+                if license['license_details']['URI'] == "":
+                    license['license_details']["URI"] = license_term_object['license_details']["URI"]
+                license["license_details"]["license_status"] = license_term_object["license_details"]["license_status"]
+                license["license_details"]["review_status"] = license_term_object["license_details"]["review_status"]
+    return license_terms_matched
+
+
+class TestCombineLicenseAndLicenseTerms(unittest.TestCase):
+
+    licenses = [
+        create_converted_license("Wiley", "20200512"),
+        create_converted_license("Wiley", "20210101", uri="http://wiley.com", notes=["Renewal"]),
+        create_converted_license("Elsevier", "20200512"),
+        # The same license twice, so that its terms are matched more than once
+        create_converted_license("Springer", "20190101"),
+        create_converted_license("Springer", "20190101")
+    ]
+    license_terms = [
+        create_converted_license("Wiley", "20200512", uri="http://a.com",
+                                 terms=[("PRINTCOPY", "YES"), ("PRINTCOPYN", "YES")], notes=["A"]),
+        create_converted_license("Springer", "20190101", license_status="RETIRED", terms=[("ARCHIVE", "YES")]),
+        create_converted_license("Wiley", "20210101", uri="http://b.com", terms=[("DIGCOPY", "YES")], notes=["B"]),
+        create_converted_license("Wiley", "20200512", license_status="RETIRED", terms=[("ILLELEC", "YES")]),
+        create_converted_license("Wiley", "20220101", terms=[("COURSERES", "YES")]),
+        create_converted_license("wiley", "20200512", terms=[("ELECLINK", "YES")])
+    ]
+
+    def test_combine_matches_legacy(self):
+        expected_licenses = copy.deepcopy(self.licenses)
+        expected_license_terms = copy.deepcopy(self.license_terms)
+        expected_matched = legacy_combine(expected_licenses, expected_license_terms)
+
+        alma_interface = RoamAlmaInterface([], [], Mappings, Settings)
+        alma_interface.converted_roam_licenses = copy.deepcopy(self.licenses)
+        alma_interface.converted_roam_license_terms = copy.deepcopy(self.license_terms)
+        with self.assertLogs(level="INFO") as logs:
+            alma_interface.combine_roam_license_and_license_terms()
+
+        self.assertListEqual(alma_interface.converted_roam_licenses, expected_licenses)
+        self.assertListEqual(alma_interface.converted_roam_license_terms, expected_license_terms)
+        self.assertIn("INFO:root:License Terms Matched: " + str(expected_matched), logs.output)
+        self.assertIn("INFO:root:Number of license terms unmatched: 2", logs.output)
+        self.assertIn("INFO:root:Number of license terms matched more than once: 1", logs.output)
+
+    def test_sort_merge_matches_hash(self):
+        for join_max_rows_in_memory in (100000, 2):
+            class SortMergeSettings(Settings):
+                join_strategy = "sort_merge"
+
+            # With 2 rows in memory, the license terms are sorted on disk
+            SortMergeSettings.join_max_rows_in_memory = join_max_rows_in_memory
+
+            with self.subTest(join_max_rows_in_memory=join_max_rows_in_memory):
+                hash_interface = RoamAlmaInterface([], [], Mappings, Settings)
+                hash_interface.converted_roam_licenses = copy.deepcopy(self.licenses)
+                hash_interface.converted_roam_license_terms = copy.deepcopy(self.license_terms)
+                with self.assertLogs(level="INFO") as hash_logs:
+                    hash_interface.combine_roam_license_and_license_terms()
+
+                sort_merge_interface = RoamAlmaInterface([], [], Mappings, SortMergeSettings)
+                sort_merge_interface.converted_roam_licenses = copy.deepcopy(self.licenses)
+                sort_merge_interface.converted_roam_license_terms = copy.deepcopy(self.license_terms)
+                with self.assertLogs(level="INFO") as sort_merge_logs:
+                    sort_merge_interface.combine_roam_license_and_license_terms()
+
+                self.assertListEqual(sort_merge_interface.converted_roam_licenses,
+                                     hash_interface.converted_roam_licenses)
+                self.assertListEqual(sort_merge_logs.output[1:], hash_logs.output[1:])
+
+    def test_merge_joined_licenses_order(self):
+        alma_interface = RoamAlmaInterface([], [], Mappings, Settings)
+
+        combined_licenses = alma_interface.iter_merge_joined_licenses(
+            copy.deepcopy(self.licenses), iter(copy.deepcopy(self.license_terms)))
+
+        # The licenses are yielded as their groups are completed, in the order of their keys
+        self.assertListEqual([RoamAlmaInterface.get_license_key(license) for license in combined_licenses], [
+            ("Elsevier", "20200512"), ("Springer", "20190101"), ("Springer", "20190101"),
+            ("Wiley", "20200512"), ("Wiley", "20210101")
+        ])
+
+    def test_unknown_join_strategy(self):
+        class BadSettings(Settings):
+            join_strategy = "nested_loop"
+
+        alma_interface = RoamAlmaInterface([], [], Mappings, BadSettings)
+        with self.assertRaises(ValueError):
+            alma_interface.combine_roam_license_and_license_terms()
+
+
+def create_roam_license_term(name, license_name, start_date, allowed="yes", active=True, qualifiers="", description="",
+                             summary="", notes="", publisher="", links=""):
+    return {
+        "Name": name, "License Name": license_name, "Active": active, "Start Date": start_date, "End Date": "",
+        "Allowed": allowed, "License Qualifiers": qualifiers, "Description": description, "License Summary": summary,
+        "License Notes": notes, "Publisher": publisher, "License Links": links
+    }
+
+
+class TestGroupedLicenseTerms(unittest.TestCase):
+
+    roam_license_terms = [
+        create_roam_license_term("Printing", "Wiley", "20200512", description="Reasonable amount"),
+        create_roam_license_term("Archiving", "Springer", "20190101", allowed="no", active=False),
+        create_roam_license_term("Copying", "Wiley", "20200512", allowed="n/a", summary="Summary", links="http://a.com"),
+        create_roam_license_term("Usage Statistics", "Wiley", "20200512", active=False, notes="Notes",
+                                 links="http://b.com", description="COUNTER 5"),
+        create_roam_license_term("Printing", "Elsevier", "20200512")
+    ]
+    licenses = [
+        create_converted_license("Wiley", "20200512"),
+        create_converted_license("Springer", "20190101", uri="http://springer.com", notes=["Springer notes"]),
+        create_converted_license("Springer", "20190101")
+    ]
+
+    def combine(self, group_license_terms):
+        class GroupingSettings(Settings):
+            pass
+        GroupingSettings.group_license_terms = group_license_terms
+
+        alma_interface = RoamAlmaInterface(
+            [], copy.deepcopy(self.roam_license_terms), Mappings, GroupingSettings)
+        alma_interface.converted_roam_licenses = copy.deepcopy(self.licenses)
+        alma_interface.get_converted_license_term_objects()
+        with self.assertLogs(level="INFO") as logs:
+            alma_interface.combine_roam_license_and_license_terms()
+        return alma_interface, logs.output
+
+    def test_grouped_license_terms(self):
+        alma_interface, _ = self.combine(True)
+
+        # One object per license, in the order the licenses first appear
+        grouped_license_terms = alma_interface.converted_roam_license_terms
+        self.assertListEqual([RoamAlmaInterface.get_license_key(group) for group in grouped_license_terms],
+                             [("Wiley", "20200512"), ("Springer", "20190101"), ("Elsevier", "20200512")])
+        self.assertListEqual([group["row_count"] for group in grouped_license_terms], [3, 1, 1])
+
+        wiley = grouped_license_terms[0]
+        self.assertListEqual([term["term_code"] for term in wiley["term_list"]],
+                             ["PRINTCOPY", "PRINTCOPYN", "DIGCOPY", "OTHERUSERSTRN"])
+        self.assertListEqual(wiley["note_list"], [{"content": "License Summary: Summary"}])
+        self.assertEqual(wiley["license_details"]["URI"], "http://a.com")
+        self.assertEqual(wiley["license_details"]["license_status"], "RETIRED")
+
+    def test_grouped_combine_matches_rows(self):
+        row_interface, row_logs = self.combine(False)
+        grouped_interface, grouped_logs = self.combine(True)
+
+        self.assertListEqual(grouped_interface.converted_roam_licenses, row_interface.converted_roam_licenses)
+        # The same number of rows are matched, unmatched and matched more than once
+        for message in ["License Terms Matched: 5", "Number of license terms unmatched: 1",
+                        "Number of license terms matched more than once: 1"]:
+            self.assertIn("INFO:root:" + message, row_logs)
+            self.assertIn("INFO:root:" + message, grouped_logs)
+
+
+class TestLicenseNotes(unittest.TestCase):
+
+    def test_notes_built_once(self):
+        roam_license_terms = [
+            create_roam_license_term("Printing", "Wiley", "20200512", summary="Summary", notes="Long notes " * 100),
+            create_roam_license_term("Copying", "Wiley", "20200512", summary="Summary", notes="Long notes " * 100),
+            create_roam_license_term("Printing", "Wiley", "20210101", summary="Summary", notes="Long notes " * 100),
+            create_roam_license_term("Archiving", "Wiley", "20210101", publisher="Wiley"),
+            create_roam_license_term("Copying", "Wiley", "20220101", summary="Summary", notes="Long notes " * 100)
+        ]
+        alma_interface = RoamAlmaInterface([], roam_license_terms, Mappings, Settings)
+
+        converted_license_terms = alma_interface.get_converted_license_term_objects()
+
+        # Consecutive rows with the same notes share one notes array, even across licenses
+        self.assertListEqual(converted_license_terms[0]["note_list"], [
+            {"content": "License Summary: Summary"},
+            {"content": "License Notes: " + "Long notes " * 100}
+        ])
+        self.assertIs(converted_license_terms[1]["note_list"], converted_license_terms[0]["note_list"])
+        self.assertIs(converted_license_terms[2]["note_list"], converted_license_terms[0]["note_list"])
+        self.assertListEqual(converted_license_terms[3]["note_list"], [{"content": "Publisher: Wiley"}])
+        # Only the last notes are kept, so notes seen earlier are built again
+        self.assertListEqual(converted_license_terms[4]["note_list"], converted_license_terms[0]["note_list"])
+        self.assertIsNot(converted_license_terms[4]["note_list"], converted_license_terms[0]["note_list"])
+
+    def test_no_notes(self):
+        alma_interface = RoamAlmaInterface([], [], Mappings, Settings)
+
+        first_notes = alma_interface._RoamAlmaInterface__convert_license_notes("", "", "")
+        second_notes = alma_interface._RoamAlmaInterface__convert_license_notes("", "", "")
+
+        self.assertListEqual(first_notes, [])
+        self.assertIsNot(first_notes, second_notes)
+
+
+class EditedXsdSettings(Settings):
+    """Test settings validating against the edited XSD, as the official one only allows its own license codes.
+    Defined at module level, so that it can be sent to worker processes."""
+    xsd_file = "config/erm_license_edited.xsd"
+
+
+class TestStreamExport(unittest.TestCase):
+
+    roam_licenses = [
+        {"Name": "Wiley", "Start Date": "20200512", "End Date": "20200724", "License Links": ""},
+        {"Name": "Springer", "Start Date": "20190101", "End Date": "", "License Links": "http://springer.com"},
+        {"Name": "Elsevier", "Start Date": "20200512", "End Date": "", "License Links": ""}
+    ]
+
+    def export_batch(self, settings, output_folder):
+        alma_interface = RoamAlmaInterface(
+            copy.deepcopy(self.roam_licenses), copy.deepcopy(TestGroupedLicenseTerms.roam_license_terms),
+            Mappings, settings)
+        alma_interface.get_converted_license_objects()
+        alma_interface.get_converted_license_term_objects()
+        alma_interface.combine_roam_license_and_license_terms()
+        alma_interface.create_generateds_instances()
+        alma_interface.export_validate_generateds_instances(output_folder)
+
+    def export_stream(self, settings, output_folder):
+        alma_interface = RoamAlmaInterface(
+            copy.deepcopy(self.roam_licenses), iter(copy.deepcopy(TestGroupedLicenseTerms.roam_license_terms)),
+            Mappings, settings)
+        return alma_interface.stream_export_validate_licenses(output_folder)
+
+    def test_stream_matches_batch(self):
+        class StreamSettings(EditedXsdSettings):
+            join_max_rows_in_memory = 2
+
+        with tempfile.TemporaryDirectory() as batch_folder, tempfile.TemporaryDirectory() as stream_folder:
+            with self.assertLogs(level="INFO"):
+                self.export_batch(StreamSettings, batch_folder)
+                exported = self.export_stream(StreamSettings, stream_folder)
+
+            self.assertEqual(exported, 3)
+            self.assertListEqual(sorted(os.listdir(stream_folder)), sorted(os.listdir(batch_folder)))
+            for file_name in os.listdir(batch_folder):
+                with open(os.path.join(batch_folder, file_name)) as batch_file, \
+                        open(os.path.join(stream_folder, file_name)) as stream_file:
+                    self.assertEqual(stream_file.read(), batch_file.read())
+
+    def test_stream_date_conversion(self):
+        roam_objects = [{"Start Date": "05/12/2020"}, {"Start Date": "Next year"}, {"Start Date": "2020-07-24"}]
+
+        converted_objects = RoamAlmaInterface.iter_objects_date_converted_to_alma(roam_objects, ["Start Date"])
+
+        # The objects are converted one at a time, and the bad dates are raised after the last one
+        self.assertDictEqual(next(converted_objects), {"Start Date": "20200512"})
+        self.assertDictEqual(next(converted_objects), {"Start Date": "Next year"})
+        self.assertDictEqual(next(converted_objects), {"Start Date": "20200724"})
+        with self.assertRaises(DateConversionError) as context:
+            next(converted_objects)
+        self.assertListEqual(context.exception.failures, [(1, "Start Date", "Next year")])
+
+
+class TestParallelExport(unittest.TestCase):
+
+    def test_parallel_matches_serial(self):
+        roam_licenses = [{"Name": "License " + str(i), "Start Date": "20200512", "End Date": "", "License Links": ""}
+                         for i in range(7)]
+        roam_license_terms = [create_roam_license_term("Printing", "License " + str(i), "20200512", notes="Notes")
+                              for i in range(7)]
+
+        with tempfile.TemporaryDirectory() as serial_folder, tempfile.TemporaryDirectory() as parallel_folder:
+            with self.assertLogs(level="INFO"):
+                serial_interface = RoamAlmaInterface(
+                    copy.deepcopy(roam_licenses), copy.deepcopy(roam_license_terms), Mappings, EditedXsdSettings)
+                serial_interface.get_converted_license_objects()
+                serial_interface.get_converted_license_term_objects()
+                serial_interface.combine_roam_license_and_license_terms()
+                serial_interface.create_generateds_instances()
+                serial_interface.export_validate_generateds_instances(serial_folder)
+
+                parallel_interface = RoamAlmaInterface(
+                    copy.deepcopy(roam_licenses), copy.deepcopy(roam_license_terms), Mappings, EditedXsdSettings)
+                parallel_interface.get_converted_license_objects()
+                parallel_interface.get_converted_license_term_objects()
+                parallel_interface.combine_roam_license_and_license_terms()
+                exported = parallel_interface.export_validate_licenses_parallel(
+                    parallel_folder, workers=2, shards_per_worker=2)
+
+            self.assertEqual(exported, 7)
+            self.assertListEqual(sorted(os.listdir(parallel_folder)), sorted(os.listdir(serial_folder)))
+            for file_name in os.listdir(serial_folder):
+                with open(os.path.join(serial_folder, file_name)) as serial_file, \
+                        open(os.path.join(parallel_folder, file_name)) as parallel_file:
+                    self.assertEqual(parallel_file.read(), serial_file.read())
+
+    def test_worker_interface_created_once(self):
+        roam_licenses = [{"Name": "License " + str(i), "Start Date": "20200512", "End Date": "", "License Links": ""}
+                         for i in range(4)]
+        alma_interface = RoamAlmaInterface(copy.deepcopy(roam_licenses), [], Mappings, EditedXsdSettings)
+        numbered_licenses = list(enumerate(alma_interface.get_converted_license_objects()))
+
+        RoamAlmaInterface.init_export_worker(Mappings, EditedXsdSettings)
+        with tempfile.TemporaryDirectory() as output_folder, \
+                mock.patch.object(RoamAlmaInterface, "compile_term_mappings") as compile_term_mappings:
+            # The shards of a worker are all exported with the interface it was set up with
+            for shard in [numbered_licenses[:2], numbered_licenses[2:]]:
+                RoamAlmaInterface.export_validate_license_shard(output_folder, "license-", "", shard)
+
+            self.assertEqual(len(os.listdir(output_folder)), 4)
+        compile_term_mappings.assert_not_called()
+
+
+class TestLicenseCodes(unittest.TestCase):
+
+    def get_license_codes(self, roam_licenses, settings):
+        alma_interface = RoamAlmaInterface(copy.deepcopy(roam_licenses), [], Mappings, settings)
+        return {converted_license["license_details"]["license_name"]: converted_license["license_details"]["license_code"]
+                for converted_license in alma_interface.get_converted_license_objects()}
+
+    def test_codes_independent_of_order(self):
+        roam_licenses = [{"Name": "License " + str(i), "Start Date": "20200512", "End Date": ""} for i in range(5)]
+
+        with tempfile.TemporaryDirectory() as registry_folder:
+            for strategy in ["hash", "registry"]:
+                class CodeSettings(Settings):
+                    license_code_strategy = strategy
+                    license_code_registry = os.path.join(registry_folder, "license_codes.json")
+
+                with self.subTest(strategy=strategy):
+                    codes = self.get_license_codes(roam_licenses, CodeSettings)
+                    reordered_codes = self.get_license_codes(roam_licenses[::-1], CodeSettings)
+
+                    self.assertDictEqual(reordered_codes, codes)
+                    self.assertEqual(len(set(codes.values())), len(roam_licenses))
+
+            self.assertEqual(codes["License 0"], "ROAM-0")
+
+    def test_duplicate_licenses_unique_codes(self):
+        roam_licenses = [{"Name": name, "Start Date": "20200512", "End Date": ""}
+                         for name in ["License 0", "License 1", "License 0", "License 0"]]
+
+        with tempfile.TemporaryDirectory() as registry_folder:
+            for strategy in ["hash", "registry"]:
+                class CodeSettings(Settings):
+                    license_code_strategy = strategy
+                    license_code_registry = os.path.join(registry_folder, "license_codes.json")
+
+                alma_interface = RoamAlmaInterface(copy.deepcopy(roam_licenses), [], Mappings, CodeSettings)
+                with self.subTest(strategy=strategy), self.assertLogs(level="WARNING"):
+                    codes = [converted_license["license_details"]["license_code"]
+                             for converted_license in alma_interface.get_converted_license_objects()]
+
+                    self.assertEqual(len(set(codes)), len(roam_licenses))
+                    self.assertListEqual(codes[2:], [codes[0] + "-2", codes[0] + "-3"])
+
+    def test_counter_codes(self):
+        roam_licenses = [{"Name": "License " + str(i), "Start Date": "20200512", "End Date": ""} for i in range(3)]
+
+        self.assertDictEqual(self.get_license_codes(roam_licenses[::-1], Settings),
+                             {"License 2": "ROAM-0", "License 1": "ROAM-1", "License 0": "ROAM-2"})
+
+    def test_unknown_strategy(self):
+        class CodeSettings(Settings):
+            license_code_strategy = "random"
+
+        with self.assertRaises(ValueError):
+            RoamAlmaInterface([], [], Mappings, CodeSettings)
+
+
+class TestRequiredColumns(unittest.TestCase):
+
+    def test_license_terms_columns_cover_conversion(self):
+        """Test that the projected license terms columns are enough to convert a license terms row"""
+        filepath = "tests/testdata/simple_roam_test.xlsx"
+
+        columns = RoamAlmaInterface.get_license_terms_columns(Mappings)
+        roam_object = convert_xlsx_to_objects(filepath, columns)[0]
+        self.assertSetEqual(set(roam_object.keys()), columns)
+
+        roam_object = RoamAlmaInterface.convert_objects_date_to_alma(
+            [roam_object], ["Start Date", "End Date"])[0]
+
+        alma_interface = RoamAlmaInterface(
+            [], [], Mappings, Settings)
+
+        # Would raise a KeyError if a needed column was left out
+        alma_interface._RoamAlmaInterface__convert_roam_license_terms_object(
+            roam_object)
+
+    def test_additional_columns_from_mappings(self):
+        class ExtendedMappings(Mappings):
+            additional_license_columns = ["Licensor"]
+
+        columns = RoamAlmaInterface.get_license_columns(ExtendedMappings)
+        self.assertIn("Licensor", columns)
+        self.assertIn("Name", columns)
+
+
 class TestTimestampConversion(unittest.TestCase):
 
     def test_convert_datetime_to_alma(self):
@@ -257,4 +721,68 @@ class TestTimestampConversion(unittest.TestCase):
             to_convert, ["Start Date", "End Date"])
 
         for idx, result in enumerate(actual_results):
-            self.assertDictEqual(result, expected_results[idx])
\ No newline at end of file
+            self.assertDictEqual(result, expected_results[idx])
+
+    def test_convert_date_columns_matches_rows(self):
+        """Test that the column-wise date conversion gives the same results as the row-wise one"""
+        def create_objects():
+            return [
+                {"Name": "US format", "Start Date": "05/12/2020", "End Date": ""},
+                {"Name": "ISO format", "Start Date": "2020-05-12",
+                    "End Date": datetime(2024, 5, 27)},
+                {"Name": "Timestamp", "Start Date": Timestamp(
+                    year=2022, month=2, day=25, hour=12, minute=12), "End Date": "1/2/2030"}
+            ]
+
+        self.assertListEqual(
+            RoamAlmaInterface.convert_objects_date_columns_to_alma(
+                create_objects() + create_objects(), ["Start Date", "End Date"]),
+            list(RoamAlmaInterface.iter_objects_date_converted_to_alma(
+                create_objects() + create_objects(), ["Start Date", "End Date"])))
+
+        # Both report the same failures
+        failures = []
+        for convert in [RoamAlmaInterface.convert_objects_date_columns_to_alma,
+                        lambda objects, properties: list(
+                            RoamAlmaInterface.iter_objects_date_converted_to_alma(objects, properties))]:
+            objects = create_objects() + [{"Name": "Bad", "Start Date": "Next year", "End Date": "2020-13-01"}]
+            with self.assertRaises(DateConversionError) as context:
+                convert(objects, ["Start Date", "End Date"])
+            failures.append(context.exception.failures)
+        self.assertListEqual(failures[0], failures[1])
+
+    def test_convert_date_columns_bool_not_a_date(self):
+        to_convert = [{"Start Date": 43963}, {"Start Date": True}, {"Start Date": 1}]
+
+        with self.assertRaises(DateConversionError) as context:
+            RoamAlmaInterface.convert_objects_date_columns_to_alma(to_convert, ["Start Date"])
+
+        self.assertListEqual(context.exception.failures, [(1, "Start Date", True)])
+        self.assertListEqual(to_convert, [{"Start Date": "20200512"}, {"Start Date": True}, {"Start Date": "19000101"}])
+
+    def test_convert_date_columns_excel_serials(self):
+        to_convert = [{"Start Date": 43963, "End Date": "44036"}]
+
+        converted_objects = RoamAlmaInterface.convert_objects_date_columns_to_alma(
+            to_convert, ["Start Date", "End Date"])
+
+        self.assertDictEqual(converted_objects[0], {"Start Date": "20200512", "End Date": "20200724"})
+
+    def test_convert_date_columns_reports_all_failures(self):
+        to_convert = [
+            {"Start Date": "2020-05-12", "End Date": "Next year"},
+            {"Start Date": "2020-13-01", "End Date": ""},
+            {"Start Date": "02/25/2022", "End Date": "31/12/2030"}
+        ]
+
+        with self.assertRaises(DateConversionError) as context:
+            RoamAlmaInterface.convert_objects_date_columns_to_alma(
+                to_convert, ["Start Date", "End Date"])
+
+        self.assertListEqual(context.exception.failures, [
+            (0, "End Date", "Next year"),
+            (1, "Start Date", "2020-13-01"),
+            (2, "End Date", "31/12/2030")
+        ])
+        # The dates that could be converted still are
+        self.assertEqual(to_convert[2]["Start Date"], "20220225")
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from bin.xlsx_cache import convert_xlsx_to_objects_cached
+from bin.xlsx_to_objects import convert_xlsx_to_objects
+
+
+class TestXlsxCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_folder = tempfile.mkdtemp()
+        self.input_folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_folder)
+        shutil.rmtree(self.input_folder)
+
+    def copy_input(self, filepath, name="input.xlsx"):
+        """Copy a test file to the temporary input folder, so that it can be changed"""
+        input_filepath = os.path.join(self.input_folder, name)
+        shutil.copyfile(filepath, input_filepath)
+        return input_filepath
+
+    def get_cache_entries(self):
+        return sorted(os.listdir(self.cache_folder))
+
+    def test_cache_hit(self):
+        filepath = 'tests/testdata/test_standard_xlsx.xlsx'
+        expected_objects = convert_xlsx_to_objects(filepath)
+
+        # The first run parses the file and writes the cache entry
+        self.assertListEqual(convert_xlsx_to_objects_cached(
+            filepath, cache_folder=self.cache_folder), expected_objects)
+        self.assertEqual(len(self.get_cache_entries()), 1)
+
+        # The second run loads the cache entry
+        self.assertListEqual(convert_xlsx_to_objects_cached(
+            filepath, cache_folder=self.cache_folder), expected_objects)
+        self.assertEqual(len(self.get_cache_entries()), 1)
+
+    def test_reader_options_are_part_of_key(self):
+        filepath = 'tests/testdata/test_standard_xlsx.xlsx'
+
+        convert_xlsx_to_objects_cached(
+            filepath, cache_folder=self.cache_folder)
+        projected_objects = convert_xlsx_to_objects_cached(
+            filepath, {"Make"}, cache_folder=self.cache_folder)
+
+        self.assertListEqual(projected_objects, [
+                             {"Make": "Ford"}, {"Make": "Mazda"}, {"Make": "Subaru"}])
+
+    def test_reader_options_keep_their_own_entries(self):
+        filepath = 'tests/testdata/test_standard_xlsx.xlsx'
+
+        # Reading the same file with other columns (like --preflight and a full run do) keeps both entries
+        for _ in range(2):
+            convert_xlsx_to_objects_cached(
+                filepath, cache_folder=self.cache_folder)
+            convert_xlsx_to_objects_cached(
+                filepath, {"Make"}, cache_folder=self.cache_folder)
+            self.assertEqual(len(self.get_cache_entries()), 2)
+
+    def test_changed_file_replaces_stale_entry(self):
+        filepath = self.copy_input('tests/testdata/test_standard_xlsx.xlsx')
+        convert_xlsx_to_objects_cached(
+            filepath, cache_folder=self.cache_folder)
+        first_entries = self.get_cache_entries()
+
+        # Change the input file
+        shutil.copyfile('tests/testdata/test_empty_cells_xlsx.xlsx', filepath)
+        objects = convert_xlsx_to_objects_cached(
+            filepath, cache_folder=self.cache_folder)
+
+        self.assertListEqual(
+            objects, convert_xlsx_to_objects('tests/testdata/test_empty_cells_xlsx.xlsx'))
+        second_entries = self.get_cache_entries()
+        self.assertEqual(len(second_entries), 1)
+        self.assertNotEqual(first_entries, second_entries)
+
+    def test_corrupt_entry_is_replaced(self):
+        filepath = 'tests/testdata/test_standard_xlsx.xlsx'
+        convert_xlsx_to_objects_cached(
+            filepath, cache_folder=self.cache_folder)
+
+        # Corrupt the cache entry
+        entry_path = os.path.join(
+            self.cache_folder, self.get_cache_entries()[0])
+        with open(entry_path, "wb") as entry_file:
+            entry_file.write(b"not a pickle")
+
+        self.assertListEqual(convert_xlsx_to_objects_cached(
+            filepath, cache_folder=self.cache_folder), convert_xlsx_to_objects(filepath))
+        self.assertGreater(os.path.getsize(entry_path), len(b"not a pickle"))
+
+    def test_cache_size_cap(self):
+        first_filepath = self.copy_input(
+            'tests/testdata/test_standard_xlsx.xlsx', "first.xlsx")
+        second_filepath = self.copy_input(
+            'tests/testdata/test_empty_cells_xlsx.xlsx', "second.xlsx")
+
+        convert_xlsx_to_objects_cached(
+            first_filepath, cache_folder=self.cache_folder)
+        entry_size = os.path.getsize(os.path.join(
+            self.cache_folder, self.get_cache_entries()[0]))
+        os.utime(os.path.join(self.cache_folder,
+                 self.get_cache_entries()[0]), (0, 0))
+
+        # Only room for one entry, so the least recently used one is removed
+        convert_xlsx_to_objects_cached(
+            second_filepath, cache_folder=self.cache_folder, max_cache_size=entry_size + 100)
+
+        self.assertEqual(len(self.get_cache_entries()), 1)
+        self.assertListEqual(convert_xlsx_to_objects_cached(second_filepath, cache_folder=self.cache_folder),
+                             convert_xlsx_to_objects(second_filepath))
+
+
+if __name__ == '__main__':
+    unittest.main()
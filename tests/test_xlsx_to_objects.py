@@ -1,15 +1,13 @@
 import unittest
 
-from bin.xlsx_to_objects import convert_xlsx_to_objects, clean_json
+import json
+import types
+import unicodedata
 
+from bs4 import BeautifulSoup
 
-def create_car(make, model, engine, hp):
-    return {
-        "Make": make,
-        "Model": model,
-        "Engine": engine,
-        "HP": hp
-    }
+from bin.xlsx_to_objects import convert_xlsx_to_objects, clean_cache_info, clean_json, clean_string, clear_clean_cache, iter_xlsx_rows
+from tests.cars import create_car
 
 
 class TestXlsxToObjects(unittest.TestCase):
@@ -43,6 +41,58 @@ class TestXlsxToObjects(unittest.TestCase):
         for i, xlsx_parsed_object in enumerate(xlsx_parsed_objects):
             self.assertDictEqual(xlsx_parsed_object, expected_objects[i])
 
+    def test_iter_xlsx_rows(self):
+        filepath = 'tests/testdata/test_empty_cells_xlsx.xlsx'
+        expected_objects = [
+            create_car("Ford", "Fusion", "1.5t", ""),
+            create_car("Mazda", 6, "2.5na", 184),
+            create_car("Subaru", "", "2.5na", 170)
+        ]
+
+        # Stream the file
+        xlsx_rows = iter_xlsx_rows(filepath)
+        self.assertIsInstance(xlsx_rows, types.GeneratorType)
+
+        # Assert they're equal
+        self.assertListEqual(list(xlsx_rows), expected_objects)
+
+    def test_column_projection_xlsx(self):
+        filepath = 'tests/testdata/test_empty_cells_xlsx.xlsx'
+        expected_objects = [
+            {"Make": "Ford", "HP": ""},
+            {"Make": "Mazda", "HP": 184},
+            {"Make": "Subaru", "HP": 170}
+        ]
+
+        # Only parse two of the columns, plus one the sheet doesn't have
+        xlsx_parsed_objects = convert_xlsx_to_objects(
+            filepath, {"Make", "HP", "Color"})
+
+        self.assertListEqual(xlsx_parsed_objects, expected_objects)
+
+    def test_schema_xlsx(self):
+        filepath = 'tests/testdata/test_empty_cells_xlsx.xlsx'
+        expected_objects = [
+            create_car("Ford", "Fusion", "1.5t", ""),
+            create_car("Mazda", "6", "2.5na", 184),
+            create_car("Subaru", "", "2.5na", 170)
+        ]
+
+        # The Model column is declared as a string, so the Mazda 6 isn't inferred as a number
+        xlsx_parsed_objects = convert_xlsx_to_objects(
+            filepath, schema={"Model": "string"})
+
+        self.assertListEqual(xlsx_parsed_objects, expected_objects)
+
+    def test_trailing_empty_rows_xlsx(self):
+        # This sheet has a single row, followed by a number of formatted but empty rows
+        filepath = 'tests/testdata/simple_roam_test.xlsx'
+
+        xlsx_parsed_objects = convert_xlsx_to_objects(filepath)
+
+        self.assertEqual(len(xlsx_parsed_objects), 1)
+        self.assertEqual(xlsx_parsed_objects[0]["License Name"], "Wiley")
+
     def test_clean_html_xlsx_simple(self):
         input_filepath = 'tests/testdata/test_clean_html_simple_input.xlsx'
         expected_objects = [
@@ -85,5 +135,87 @@ class TestXlsxToObjects(unittest.TestCase):
                 cleaned_xlsx_parsed_object, expected_objects[i])
 
 
+def legacy_clean_json(json_objects, remove_newline=False):
+    """The original clean_json, which cleaned the whole dataset as one JSON string"""
+    stringified_json = json.dumps(json_objects, ensure_ascii=False)
+    stringified_cleaned_json = BeautifulSoup(
+        stringified_json, 'html.parser').get_text()
+    stringified_normalized_json = unicodedata.normalize(
+        "NFKD", stringified_cleaned_json)
+    if remove_newline == True:
+        stringified_normalized_json = stringified_normalized_json.replace(
+            "\\n", " ")
+    return json.loads(stringified_normalized_json)
+
+
+class TestCleanJson(unittest.TestCase):
+
+    corpus = [
+        "Plain ASCII text",
+        "",
+        "<p>Paragraph</p> and <b>bold</b>",
+        '<div class="row">2.5na</div>',
+        "Fish &amp; Chips &lt;tasty&gt;",
+        "A & B, x < y",
+        "Forester\xa0 \xa0",
+        "Caf\u00e9 cr\u00e8me",
+        "\ufb01ne ligature",
+        "Line one\nLine two\n",
+        "<ul><li>One</li>\n<li>Two</li></ul>",
+        "Reserved&nbsp;&copy; 2020",
+    ]
+
+    def test_clean_json_matches_legacy(self):
+        objects = [{"Name": value, "Active": True, "HP": 181}
+                   for value in self.corpus]
+
+        for remove_newline in (False, True):
+            self.assertListEqual(clean_json(objects, remove_newline),
+                                 legacy_clean_json(objects, remove_newline))
+
+    def test_clean_string_fast_path(self):
+        value = "Nothing to clean here"
+        self.assertIs(clean_string(value), value)
+
+    def test_clean_cache(self):
+        clear_clean_cache()
+        notes = "<p>License Notes:&nbsp;the same on every term row</p>"
+        objects = [{"Name": "Term " + str(i), "License Notes": notes}
+                   for i in range(20)]
+
+        cleaned_objects = clean_json(objects, remove_newline=True)
+
+        # Each distinct value needing cleaning is only cleaned once. Plain values don't use the cache
+        cache_info = clean_cache_info()
+        self.assertEqual(cache_info.misses, 1)
+        self.assertEqual(cache_info.hits, 19)
+        self.assertEqual(cleaned_objects[19]["License Notes"], cleaned_objects[0]["License Notes"])
+
+        # The remove_newline setting is part of the key
+        clean_json(objects, remove_newline=False)
+        self.assertEqual(clean_cache_info().misses, 2)
+
+    def test_clean_json_parallel(self):
+        objects = [{"Name": value, "Row": i}
+                   for i, value in enumerate(self.corpus)]
+
+        # Small chunks, so that the rows are split across the workers
+        cleaned_objects = clean_json(
+            objects, remove_newline=True, workers=2, chunk_size=5)
+
+        self.assertListEqual(cleaned_objects, clean_json(
+            objects, remove_newline=True))
+
+    def test_clean_json_keeps_other_types(self):
+        cleaned_object = clean_json({"Name": "<p>Wiley</p>", "Active": False, "HP": 2.5})
+
+        self.assertDictEqual(cleaned_object, {"Name": "Wiley", "Active": False, "HP": 2.5})
+
+    def test_clean_json_unknown_backend(self):
+        # Checked up front, even if no value has HTML in it
+        with self.assertRaises(ValueError):
+            clean_json({"Name": "Wiley"}, html_backend="html5lib")
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
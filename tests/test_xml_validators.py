@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+import xmlschema
+
+from bin.license_serializers import serialize_license_template
+from bin.roam_to_alma_interface import RoamAlmaInterface
+from bin.xml_validators import VALIDATION_BACKENDS, XML_VALIDATION_ERRORS, get_lxml_schema, get_xml_schema, validate_xml
+from config.config_test import Mappings, Settings
+from tests.converted_licenses import create_converted_license
+
+TERMS = [("PRINTCOPY", "PERMITTED")]
+
+
+class TestValidateXml(unittest.TestCase):
+
+    def test_schema_compiled_once(self):
+        get_xml_schema.cache_clear()
+        get_lxml_schema.cache_clear()
+        xml = serialize_license_template(create_converted_license(terms=TERMS))
+
+        for validation_backend in VALIDATION_BACKENDS:
+            for xsd_file in ["config/erm_license_official.xsd", "config/erm_license_edited.xsd"] * 3:
+                validate_xml(xml, xsd_file, validation_backend)
+                validate_xml(xml.decode("utf-8"), xsd_file, validation_backend)
+
+        self.assertEqual(get_xml_schema.cache_info().misses, 2)
+        self.assertEqual(get_lxml_schema.cache_info().misses, 2)
+
+    def test_invalid_xml(self):
+        for converted_license in [create_converted_license(license_status="SIGNED", terms=TERMS),
+                                  create_converted_license(terms=[("NOT_A_TERM", "PERMITTED")])]:
+            xml = serialize_license_template(converted_license)
+            with self.assertRaises(xmlschema.XMLSchemaValidationError):
+                validate_xml(xml, "config/erm_license_official.xsd")
+            with self.assertRaises(XML_VALIDATION_ERRORS):
+                validate_xml(xml, "config/erm_license_official.xsd", "lxml")
+
+        # The edited XSD allows any term code
+        validate_xml(serialize_license_template(create_converted_license(terms=[("NOT_A_TERM", "PERMITTED")])),
+                     "config/erm_license_edited.xsd", "lxml")
+
+    def test_malformed_xml(self):
+        for validation_backend in VALIDATION_BACKENDS:
+            for xml in [b"<license", "<license></licence>"]:
+                with self.subTest(validation_backend=validation_backend, xml=xml), \
+                        self.assertRaises(XML_VALIDATION_ERRORS):
+                    validate_xml(xml, "config/erm_license_edited.xsd", validation_backend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            validate_xml(serialize_license_template(create_converted_license(terms=TERMS)),
+                         "config/erm_license_official.xsd", "libxml")
+
+
+class TestValidateWriteXml(unittest.TestCase):
+
+    def test_invalid_not_written(self):
+        for serializer, backend in [("generateds", "xmlschema"), ("template", "xmlschema"),
+                                    ("generateds", "lxml"), ("template", "lxml")]:
+            class ValidatorSettings(Settings):
+                xml_serializer = serializer
+                validation_backend = backend
+
+            alma_interface = RoamAlmaInterface([], [], Mappings, ValidatorSettings)
+            with self.subTest(serializer=serializer, validation_backend=backend), \
+                    tempfile.TemporaryDirectory() as output_folder:
+                output_file = alma_interface.export_validate_license(
+                    create_converted_license(terms=TERMS), output_folder, 0)
+                self.assertTrue(os.path.isfile(output_file))
+
+                with self.assertLogs(level="ERROR"), self.assertRaises(XML_VALIDATION_ERRORS):
+                    alma_interface.export_validate_license(
+                        create_converted_license(license_status="SIGNED", terms=TERMS), output_folder, 1)
+                self.assertListEqual(os.listdir(output_folder), [os.path.basename(output_file)])
+
+                with self.assertLogs(level="ERROR"), self.assertRaises(XML_VALIDATION_ERRORS):
+                    alma_interface.validate_write_xml(b"<license", os.path.join(output_folder, "malformed.xml"))
+                self.assertListEqual(os.listdir(output_folder), [os.path.basename(output_file)])
+
+
+if __name__ == '__main__':
+    unittest.main()